@@ -1,265 +1,2666 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, Response, abort, render_template, request, redirect, url_for, session, flash, g, has_app_context, has_request_context, jsonify, make_response, current_app, send_from_directory, stream_with_context
+from flask.cli import AppGroup
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from babel.messages.mofile import read_mo
+from babel.messages.pofile import read_po
+from sqlalchemy import DDL, Integer, case, cast, event, extract, func, inspect, literal_column, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, load_only
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql import column, table
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import MappingProxyType
+import atexit
+import base64
+import click
+import csv
+import hashlib
+import html
+import http.client
+import io
+import ipaddress
+import json
 import os
 import random
+import re
+import secrets
+import socket
+import ssl
+import tempfile
+import threading
+import time
+import urllib.parse
+import zlib
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # in requirements.txt; create_app() warns when it is missing
+    Image = None
 
 import os
 
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-INSTANCE_DIR = os.path.join(BASE_DIR, 'instance')
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+INSTANCE_DIR = os.path.join(BASE_DIR, 'instance')
+
+os.makedirs(INSTANCE_DIR, exist_ok=True)
+
+# --------------------
+# APP CONFIG
+# --------------------
+# GET endpoints that only read: with a 'replica' bind (DATABASE_REPLICA_URL)
+# their queries go to the replica, everything else to the primary
+REPLICA_ENDPOINTS = {'index', 'news_detail', 'api_stats', 'feed', 'region_feed', 'category_feed',
+                     'sitemap_index', 'sitemap_month', 'superadmin_export_news'}
+
+
+def reads_from_replica():
+    if not has_request_context() or 'replica' not in current_app.config['SQLALCHEMY_BINDS']:
+        return False
+    return (request.endpoint in REPLICA_ENDPOINTS and request.method in ('GET', 'HEAD')
+            and not g.get('db_wrote') and session.get('db_primary_until', 0) < time.time())
+
+
+class RoutingSession(Session):
+    """db.session that sends replica-safe reads to the 'replica' bind.
+
+    Flushes and INSERT/UPDATE/DELETE statements always use the primary;
+    after one, the rest of the request reads from the primary as well.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                if has_request_context():
+                    g.db_wrote = True
+            elif reads_from_replica():
+                return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def pin_to_primary(response):
+    """After a write this browser reads from the primary for DATABASE_PIN_SECONDS,
+    so an admin sees their own edit before the replica has caught up"""
+    if g.get('db_wrote') and current_app.config['SQLALCHEMY_BINDS'].get('replica'):
+        if current_app.config['DATABASE_PIN_SECONDS']:
+            session['db_primary_until'] = int(time.time()) + current_app.config['DATABASE_PIN_SECONDS']
+    return response
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Commands registered on every app create_app() builds (flask --app app ...)
+cli = AppGroup('news')
+
+
+def default_config():
+    """Settings read from the environment each time an app is created"""
+    return {
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'dev-secret-key'),
+
+        # SQLite (Render uchun to‘g‘ri joy); DATABASE_URL overrides it
+        'SQLALCHEMY_DATABASE_URI': os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(INSTANCE_DIR, 'news.db')),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        # Read replica (SQLite file or PostgreSQL), e.g. postgresql://user@replica/news
+        'SQLALCHEMY_BINDS': {'replica': os.environ['DATABASE_REPLICA_URL']} if os.environ.get('DATABASE_REPLICA_URL') else {},
+        'DATABASE_PIN_SECONDS': int(os.environ.get('DATABASE_PIN_SECONDS', 15)),
+
+        # PRAGMAs run on every new SQLite connection (SQLITE_PROFILES below);
+        # SQLITE_PRAGMAS overrides single values, e.g. {'cache_size': -64000}
+        'SQLITE_PROFILE': os.environ.get('SQLITE_PROFILE', 'production'),
+        'SQLITE_PRAGMAS': {},
+        # Pooled connections per worker: one per gunicorn thread (--threads)
+        'DB_POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', 8)),
+
+        # Full-page cache for anonymous visitors of the feed: '' (off), 'memory' or
+        # 'filesystem' (shared by all gunicorn workers on the host)
+        'RESPONSE_CACHE': os.environ.get('RESPONSE_CACHE', ''),
+        'RESPONSE_CACHE_TTL': int(os.environ.get('RESPONSE_CACHE_TTL', 60)),
+        'RESPONSE_CACHE_MAX_BYTES': int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+        'RESPONSE_CACHE_MAX_ENTRIES': int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 10000)),
+        'RESPONSE_CACHE_DIR': os.path.join(INSTANCE_DIR, 'response_cache'),
+
+        # Compiled templates survive restarts; PRECOMPILE_TEMPLATES=1 also loads
+        # every template while the worker boots, before it accepts requests
+        'JINJA_BYTECODE_CACHE_DIR': os.path.join(INSTANCE_DIR, 'jinja_cache'),
+        'PRECOMPILE_TEMPLATES': os.environ.get('PRECOMPILE_TEMPLATES') == '1',
+
+        # Likes (and other counters) are buffered per worker and written in
+        # batches: at most this many seconds are lost if a worker crashes
+        'WRITE_BEHIND_INTERVAL': float(os.environ.get('WRITE_BEHIND_INTERVAL', 5)),
+        'WRITE_BEHIND_MAX_PENDING': int(os.environ.get('WRITE_BEHIND_MAX_PENDING', 10000)),
+
+        # Article views: 1 in VIEW_SAMPLE_EVERY is recorded (weighted), buffered
+        # like likes and summed into hourly buckets kept for VIEW_BUCKET_DAYS
+        'VIEW_SAMPLE_EVERY': int(os.environ.get('VIEW_SAMPLE_EVERY', 1)),
+        'VIEW_BUCKET_DAYS': int(os.environ.get('VIEW_BUCKET_DAYS', 90)),
+        # ?sort=trending: views weighted by 0.5 ** (age / half-life), recomputed
+        # from the buckets of the last TRENDING_WINDOW_HOURS every few minutes
+        'TRENDING_HALF_LIFE_HOURS': float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 12)),
+        'TRENDING_WINDOW_HOURS': int(os.environ.get('TRENDING_WINDOW_HOURS', 72)),
+        'TRENDING_REFRESH_SECONDS': int(os.environ.get('TRENDING_REFRESH_SECONDS', 300)),
+
+        # scope_stat is adjusted by every write; this often it is recounted
+        # from the base tables to catch drift (also: flask reconcile-stats)
+        'STATS_RECONCILE_SECONDS': int(os.environ.get('STATS_RECONCILE_SECONDS', 3600)),
+
+        # Article images: originals and thumbnails under MEDIA_DIR, made by
+        # IMAGE_WORKERS threads per worker (0: inline, for tests and scripts)
+        'MEDIA_DIR': os.environ.get('MEDIA_DIR', os.path.join(INSTANCE_DIR, 'media')),
+        'IMAGE_WORKERS': int(os.environ.get('IMAGE_WORKERS', 2)),
+        'IMAGE_MAX_BYTES': int(os.environ.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024)),
+        'IMAGE_FETCH_TIMEOUT': float(os.environ.get('IMAGE_FETCH_TIMEOUT', 10)),
+    }
+
+# SQLite defaults make readers wait while an admin commits, and every new
+# connection starts with a 2 MB page cache
+SQLITE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',       # readers never block on the writer
+        'synchronous': 'NORMAL',     # fsync at checkpoints, not every commit (safe with WAL)
+        'cache_size': -32000,        # KiB of page cache per connection
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000,        # ms a writer waits for the lock before "database is locked"
+        'temp_store': 'MEMORY',      # ORDER BY / GROUP BY scratch tables
+    },
+}
+
+
+def sqlite_pragmas(config):
+    pragmas = dict(SQLITE_PROFILES[config['SQLITE_PROFILE']])
+    pragmas.update(config['SQLITE_PRAGMAS'])
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+        cursor.close()
+
+
+def engine_options(config):
+    """Pool kept warm across requests: pooled connections keep their page cache"""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri in ('sqlite://', 'sqlite:///:memory:'):
+        return {}  # Flask-SQLAlchemy shares one in-memory connection (StaticPool)
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_POOL_SIZE'],  # CLI jobs and bursts; closed after use
+        'pool_timeout': 10,
+    }
+    if not uri.startswith('sqlite'):
+        options['pool_pre_ping'] = True  # server restarts and idle timeouts drop connections
+    return options
+
+# -------------------- 
+# MULTI-LANGUAGE SUPPORT
+# -------------------- 
+TRANSLATIONS_DIR = os.path.join(BASE_DIR, 'translations')
+LANGUAGES = ('uz', 'uz_cyrl')
+DEFAULT_LANGUAGE = 'uz'
+EMPTY_CATALOG = MappingProxyType({})
+
+
+def load_catalog(lang):
+    """msgid -> msgstr for one language, as a read-only mapping.
+
+    Reads the compiled messages.mo (`python compile_translations.py`);
+    if it is missing or older than messages.po, the .po is parsed instead.
+    """
+    folder = os.path.join(TRANSLATIONS_DIR, lang, 'LC_MESSAGES')
+    po_path = os.path.join(folder, 'messages.po')
+    mo_path = os.path.join(folder, 'messages.mo')
+
+    if os.path.exists(mo_path) and (not os.path.exists(po_path)
+                                    or os.path.getmtime(mo_path) >= os.path.getmtime(po_path)):
+        with open(mo_path, 'rb') as f:
+            messages = read_mo(f)
+    elif os.path.exists(po_path):
+        with open(po_path, 'rb') as f:
+            messages = read_po(f)
+    else:
+        return EMPTY_CATALOG
+    # Plural forms (tuple ids) are not used by _()
+    return MappingProxyType({m.id: m.string for m in messages
+                             if m.id and m.string and isinstance(m.id, str) and not m.fuzzy})
+
+
+# Loaded once per process; never rebuilt per call
+CATALOGS = MappingProxyType({lang: load_catalog(lang) for lang in LANGUAGES})
+
+
+def current_catalog():
+    """The active language's catalog, resolved once per request."""
+    if not has_request_context():
+        return EMPTY_CATALOG
+    g.catalog = CATALOGS.get(get_locale(), EMPTY_CATALOG)
+    return g.catalog
+
+
+def _(text):
+    """Translate text into the current request's language"""
+    try:
+        catalog = g.catalog
+    except (AttributeError, RuntimeError):
+        catalog = current_catalog()
+    return catalog.get(text, text)
+
+def get_locale():
+    # URL dan tilni olish
+    if request.args.get('lang'):
+        session['language'] = request.args.get('lang')
+        g.pop('catalog', None)
+    return session.get('language', DEFAULT_LANGUAGE)
+
+# --------------------
+# MODELS
+# --------------------
+class SuperAdmin(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password_hash = db.Column(db.String(120), nullable=False)
+
+    def set_password(self, password):
+        self.password_hash = generate_password_hash(password)
+
+    def check_password(self, password):
+        return check_password_hash(self.password_hash, password)
+
+
+class Region(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    slug = db.Column(db.String(100), unique=True, nullable=False)
+
+
+class Admin(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password_hash = db.Column(db.String(120), nullable=False)
+    region_id = db.Column(db.Integer, db.ForeignKey('region.id'), nullable=False)
+
+    region = db.relationship('Region', backref='admins')
+
+    def set_password(self, password):
+        self.password_hash = generate_password_hash(password)
+
+    def check_password(self, password):
+        return check_password_hash(self.password_hash, password)
+
+
+class Category(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    slug = db.Column(db.String(100), unique=True, nullable=False)
+    description = db.Column(db.Text)
+    icon = db.Column(db.String(50))  # Font Awesome icon class
+
+
+def slugify(text, max_length=80):
+    """URL slug that keeps Latin and Cyrillic letters: "O'rmon kuni" -> "ormon-kuni"."""
+    slug = re.sub(r'[\W_]+', '-', re.sub(r"['`‘’ʻʼ]", '', text.lower())).strip('-')
+    return slug[:max_length].rstrip('-') or 'news'
+
+
+EXCERPT_LENGTH = 200
+HIDDEN_HTML_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r'<[^>]*>')
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    """Plain-text start of an article, cut at a word boundary."""
+    plain = html.unescape(TAG_RE.sub(' ', HIDDEN_HTML_RE.sub(' ', content or '')))
+    plain = ' '.join(plain.split())
+    if len(plain) <= length:
+        return plain
+    cut = plain[:length + 1].rsplit(' ', 1)[0] if ' ' in plain[:length + 1] else plain[:length]
+    return cut.rstrip(' .,;:-') + '…'
+
+
+class News(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    excerpt = db.Column(db.String(EXCERPT_LENGTH + 1))  # listings never read content
+    image_url = db.Column(db.String(500))  # Rasm URL saqlash uchun
+    image_hash = db.Column(db.String(64))  # SHA-256 of the stored original, see store_original()
+    image_widths = db.Column(db.String(40))  # thumbnails made so far, e.g. '400 800 1200'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # from news_like, see flush_likes()
+    view_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # see flush_views()
+    trending_score = db.Column(db.Float, nullable=False, default=0, server_default='0')  # see refresh_trending()
+
+    admin_id = db.Column(db.Integer, db.ForeignKey('admin.id'), nullable=False)
+    region_id = db.Column(db.Integer, db.ForeignKey('region.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
+
+    admin = db.relationship('Admin', backref='news')
+    region = db.relationship('Region', backref='news')
+    category = db.relationship('Category', backref='news')
+
+    # Every listing is "newest first", optionally narrowed by one column;
+    # the superadmin table can also sort by title. id is the tie-breaker of
+    # the keyset cursor.
+    __table_args__ = (
+        db.Index('ix_news_created_at', 'created_at', 'id'),
+        db.Index('ix_news_title', 'title', 'id'),
+        db.Index('ix_news_region_created', 'region_id', 'created_at'),
+        db.Index('ix_news_category_created', 'category_id', 'created_at'),
+        db.Index('ix_news_admin_created', 'admin_id', 'created_at'),
+        db.Index('ix_news_trending', 'trending_score', 'created_at'),
+    )
+
+    def set_content(self, content):
+        self.content = content
+        self.excerpt = make_excerpt(content)
+
+    @property
+    def slug(self):
+        return slugify(self.title)
+
+
+class NewsLike(db.Model):
+    """One like per article and browser (client_id from the session cookie)"""
+    news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), primary_key=True)
+    client_id = db.Column(db.String(32), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class NewsViewHour(db.Model):
+    """Views of an article per hour (hour truncated to :00, UTC)"""
+    news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), primary_key=True)
+    hour = db.Column(db.DateTime, primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_news_view_hour_hour', 'hour'),
+    )
+
+
+def delete_news_counters(news_ids):
+    """Remove likes and view buckets of deleted news; SQLite does not enforce ON DELETE CASCADE"""
+    for model in (NewsLike, NewsViewHour):
+        model.query.filter(model.news_id.in_(news_ids)).delete(synchronize_session=False)
+
+
+class CacheVersion(db.Model):
+    """Shared invalidation counter, one row per cached data set.
+
+    Every worker compares its local copy against this row, so bumping it
+    invalidates that cache in all gunicorn workers at once.
+    """
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ScopeStat(db.Model):
+    """Materialized counters of one region, one category or the whole site.
+
+    scope is 'region', 'category', 'month' (scope_id YYYYMM of created_at)
+    or 'all' (scope_id 0). Write routes adjust them in their own
+    transaction; reconcile_stats() recounts.
+    """
+    scope = db.Column(db.String(10), primary_key=True)
+    scope_id = db.Column(db.Integer, primary_key=True)
+    news_count = db.Column(db.Integer, nullable=False, default=0)
+    admin_count = db.Column(db.Integer, nullable=False, default=0)
+    latest_news_at = db.Column(db.DateTime)
+
+
+# --------------------
+# FULL-TEXT SEARCH (SQLite FTS5)
+# --------------------
+# news_fts is an external-content FTS5 index over news.title/news.content.
+# Triggers keep it in sync with every INSERT/UPDATE/DELETE on news, so the
+# admin routes and the region cascade delete need no extra code.
+#
+# Tokenizer: unicode61 folds case for Latin and Cyrillic alike; ʻ and ʼ
+# (U+02BB/U+02BC, used in Latin Uzbek o'/g') are letters for unicode61, so
+# they are declared separators to match the plain ' and ‘ ’ spellings.
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+        title, content,
+        content='news', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2 separators 'ʻʼ'"
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS news_fts_ai AFTER INSERT ON news BEGIN
+        INSERT INTO news_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS news_fts_ad AFTER DELETE ON news BEGIN
+        INSERT INTO news_fts(news_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS news_fts_au AFTER UPDATE OF title, content ON news BEGIN
+        INSERT INTO news_fts(news_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO news_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+]
+
+for _statement in FTS_DDL:
+    event.listen(News.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+
+news_fts = table('news_fts', column('rowid'), column('title'), column('content'))
+
+# Title matches weigh more than body matches in bm25()
+FTS_RANK = func.bm25(literal_column('news_fts'), 10.0, 1.0)
+
+APOSTROPHES_RE = re.compile(r"['`‘’ʻʼ]")
+TOKEN_RE = re.compile(r'[^\W_]+')
+MAX_SEARCH_TERMS = 8
+
+
+def fts_match_expression(search_query):
+    """Turn user input into an FTS5 MATCH expression with prefix matching.
+
+    Every word becomes a prefix phrase, so "o'rmon" -> "o rmon"* and the
+    terms are ANDed. Returns None when the input has no searchable tokens.
+    """
+    phrases = []
+    for word in search_query.split()[:MAX_SEARCH_TERMS]:
+        tokens = TOKEN_RE.findall(APOSTROPHES_RE.sub(' ', word))
+        if tokens:
+            phrases.append('"%s"*' % ' '.join(tokens))
+    return ' '.join(phrases) or None
+
+
+_fts_available = {}
+
+
+def fts_enabled():
+    """True when the bound database is SQLite and news_fts exists."""
+    engine = db.engine
+    if engine.url not in _fts_available:
+        _fts_available[engine.url] = (
+            engine.dialect.name == 'sqlite' and inspect(engine).has_table('news_fts')
+        )
+    return _fts_available[engine.url]
+
+
+def search_news(query, search_query, ranked=True):
+    """Filter a News query by search_query, best bm25 matches first.
+
+    With ranked=False only the filter is applied (keyset pagination needs
+    the feed's own created_at order). Falls back to LIKE when FTS5 is not available (PostgreSQL, or an old
+    database that has not been through `flask rebuild-search-index` yet).
+    """
+    if not fts_enabled():
+        return query.filter(News.title.icontains(search_query) | News.content.icontains(search_query))
+
+    match = fts_match_expression(search_query)
+    if match is None:
+        return query.filter(db.false())
+    query = (query.join(news_fts, news_fts.c.rowid == News.id)
+                  .filter(literal_column('news_fts').op('MATCH')(match)))
+    return query.order_by(FTS_RANK) if ranked else query
+
+
+@cli.command('rebuild-search-index')
+def rebuild_search_index():
+    """Create (or re-create) news_fts and re-index every article."""
+    with db.engine.begin() as conn:
+        if conn.dialect.name != 'sqlite':
+            raise click.ClickException('FTS5 search index is only available on SQLite')
+        conn.execute(text('DROP TABLE IF EXISTS news_fts'))
+        for name in ('news_fts_ai', 'news_fts_ad', 'news_fts_au'):
+            conn.execute(text('DROP TRIGGER IF EXISTS %s' % name))
+        for statement in FTS_DDL:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO news_fts(news_fts) VALUES ('rebuild')"))
+        total = conn.execute(text('SELECT COUNT(*) FROM news')).scalar()
+    _fts_available.clear()
+    click.echo('Search index rebuilt: %d articles' % total)
+
+
+# --------------------
+# CACHE VERSIONS
+# --------------------
+def cache_versions():
+    """All shared cache versions, read at most once per request."""
+    if 'cache_versions' not in g:
+        rows = db.session.query(CacheVersion.name, CacheVersion.version, CacheVersion.updated_at).all()
+        g.cache_versions = {name: version for name, version, _updated in rows}
+        g.cache_updated_at = {name: updated for name, _version, updated in rows}
+    return g.cache_versions
+
+
+def cache_updated_at(name):
+    """When `name` was last bumped (None if never), from the same read."""
+    cache_versions()
+    return g.cache_updated_at.get(name)
+
+
+def bump_cache_version(name):
+    """Invalidate the `name` cache everywhere.
+
+    Runs inside the caller's transaction: the new version becomes visible
+    to other workers together with the change it describes.
+    """
+    now = datetime.utcnow()
+    bumped = db.session.execute(
+        db.update(CacheVersion)
+          .where(CacheVersion.name == name)
+          .values(version=CacheVersion.version + 1, updated_at=now)
+    ).rowcount
+    if not bumped:
+        db.session.add(CacheVersion(name=name, version=1, updated_at=now))
+    g.pop('cache_versions', None)
+    g.pop('cache_updated_at', None)
+
+
+RegionItem = namedtuple('RegionItem', 'id name slug')
+CategoryItem = namedtuple('CategoryItem', 'id name slug description icon')
+
+def cached_taxonomy():
+    """Regions and categories for the menus, reloaded only after a bump.
+
+    Plain tuples rather than ORM objects: they outlive the session and
+    are shared between requests.
+    """
+    version = cache_versions().get('taxonomy', 0)
+    cache = current_app.extensions['taxonomy_cache']
+    if cache.get('version') != version:
+        regions = tuple(RegionItem(r.id, r.name, r.slug)
+                        for r in Region.query.order_by(Region.id))
+        categories = tuple(CategoryItem(c.id, c.name, c.slug, c.description, c.icon)
+                           for c in Category.query.order_by(Category.id))
+        cache.update(version=version, regions=regions, categories=categories)
+    return cache['regions'], cache['categories']
+
+
+# --------------------
+# DATABASE INIT (ENG MUHIM QISM)
+# --------------------
+# Run once per deploy (flask --app app init-db), never on import: workers
+# and scripts that import this module must not race on create_all()
+DEFAULT_CATEGORIES = [
+    {'name': 'O\'rmonlarni ko\'paytirish', 'slug': 'forestation', 'icon': 'fas fa-tree'},
+    {'name': 'Yashil hududlar', 'slug': 'green-areas', 'icon': 'fas fa-leaf'},
+    {'name': 'Cho\'llanishga qarshi kurash', 'slug': 'desertification', 'icon': 'fas fa-sun'},
+    {'name': 'Ekologik ta\'lim', 'slug': 'eco-education', 'icon': 'fas fa-graduation-cap'},
+    {'name': 'Xalqaro hamkorlik', 'slug': 'international', 'icon': 'fas fa-globe'},
+    {'name': 'Yoshlar siyosati', 'slug': 'youth-policy', 'icon': 'fas fa-users'},
+]
+
+
+def dialect_insert(model):
+    """INSERT with the ON CONFLICT clauses of the dialect in use (SQLite or PostgreSQL)"""
+    dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
+
+
+def insert_ignore(model):
+    """INSERT ... ON CONFLICT DO NOTHING"""
+    return dialect_insert(model).on_conflict_do_nothing()
+
+
+def seed_defaults():
+    """SuperAdmin and default categories; returns (superadmin_created, categories_added)"""
+    # SuperAdmin avtomatik yaratiladi (agar yo‘q bo‘lsa)
+    superadmin_created = not db.session.query(SuperAdmin.query.filter_by(username='superadmin').exists()).scalar()
+    if superadmin_created:
+        sa = SuperAdmin(username='superadmin')
+        sa.set_password('admin123')
+        db.session.add(sa)
+
+    # Default kategoriyalar: one INSERT, existing slugs/names are skipped
+    categories_added = db.session.execute(insert_ignore(Category).values(DEFAULT_CATEGORIES)).rowcount
+    if categories_added:
+        bump_cache_version('taxonomy')
+    db.session.commit()
+    return superadmin_created, categories_added
+
+
+def init_db():
+    db.create_all()
+    seeded = seed_defaults()
+    reconcile_stats()
+    return seeded
+
+
+def report_seed(superadmin_created, categories_added):
+    if superadmin_created:
+        click.echo('SuperAdmin created: superadmin / admin123')
+    click.echo('Default categories added: %d' % categories_added)
+
+
+@cli.command('init-db')
+def init_db_command():
+    """Create missing tables (and the search index), then seed defaults."""
+    report_seed(*init_db())
+
+
+@cli.command('seed')
+def seed_command():
+    """Insert the SuperAdmin and default categories if they are missing."""
+    report_seed(*seed_defaults())
+
+
+@cli.command('sync-replica')
+def sync_replica():
+    """Copy the primary SQLite database onto the 'replica' bind.
+
+    A local stand-in for replication when both are SQLite files; a
+    PostgreSQL replica is kept current by the server itself.
+    """
+    if 'replica' not in db.engines:
+        raise click.ClickException('No replica bind: set DATABASE_REPLICA_URL')
+    primary, replica = db.engine, db.engines['replica']
+    if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise click.ClickException('Only SQLite -> SQLite can be synced here; use streaming replication for PostgreSQL')
+
+    replica.dispose()  # no pooled reader may hold the file during the copy
+    source, target = primary.raw_connection(), replica.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        source.close()
+        target.close()
+    replica.dispose()
+    click.echo('Replica %s synced from %s' % (replica.url, primary.url))
+
+
+# --------------------
+# PAGINATION
+# --------------------
+NEWS_PER_PAGE = 10
+COUNT_CACHE_TTL = 60  # seconds
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+
+def count_statement(query):
+    """SELECT COUNT(*) over query, as Query.count() issues it (without ORDER BY)"""
+    return db.select(func.count()).select_from(query.order_by(None).subquery())
+
+
+def cached_count(query, key):
+    """COUNT(*) of query, reused for COUNT_CACHE_TTL seconds per key.
+
+    The key includes the 'news' version, so adding or deleting an article
+    recounts at once; the total decides whether the page links to the next
+    one, and that page is then kept by the response cache and its ETag.
+    """
+    key = key + (cache_versions().get('news', 0),)
+    now = time.monotonic()
+    cache = current_app.extensions['count_cache']
+    hit = cache.get(key)
+    if hit and hit[1] > now:
+        return hit[0]
+    if len(cache) >= COUNT_CACHE_MAX_ENTRIES:
+        cache.clear()
+    total = db.session.scalar(count_statement(query))
+    cache[key] = (total, now + COUNT_CACHE_TTL)
+    return total
+
+
+def encode_cursor(news, direction):
+    """Opaque token pointing before ('n') or after ('p') a feed item."""
+    raw = '%s|%d|%s' % (news.created_at.isoformat(), news.id, direction)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor(); None for an empty or malformed token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, news_id, direction = raw.split('|')
+        if direction not in ('n', 'p'):
+            return None
+        return datetime.fromisoformat(created_at), int(news_id), direction
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    """One page of the feed in cursor mode, keyed on (created_at, id).
+
+    Only per_page + 1 rows are read, whatever the depth; there is no
+    OFFSET and the total comes from cached_count().
+    """
+    cursor_mode = True
+
+    def __init__(self, query, cursor, per_page, total):
+        self.total = total
+        self.per_page = per_page
+        position = decode_cursor(cursor) if cursor else None
+        rows = keyset_query(query, position, per_page).all()
+
+        if position and position[2] == 'p':
+            has_newer = len(rows) > per_page
+            self.items = rows[:per_page][::-1]
+            has_older = True
+        else:
+            has_older = len(rows) > per_page
+            self.items = rows[:per_page]
+            has_newer = position is not None
+
+        self.has_next = bool(self.items) and has_older
+        self.has_prev = bool(self.items) and has_newer
+        self.next_cursor = encode_cursor(self.items[-1], 'n') if self.has_next else None
+        self.prev_cursor = encode_cursor(self.items[0], 'p') if self.has_prev else None
+        self.pages = 1 + self.has_next + self.has_prev
+
+
+def keyset_query(query, position, per_page):
+    """The per_page + 1 rows after (or, for a 'p' cursor, before) position"""
+    key = tuple_(News.created_at, News.id)
+    if position and position[2] == 'p':
+        # Walk towards newer items; KeysetPage flips them back to feed order
+        return (query.filter(key > tuple_(position[0], position[1]))
+                     .order_by(News.created_at.asc(), News.id.asc())
+                     .limit(per_page + 1))
+    if position:
+        query = query.filter(key < tuple_(position[0], position[1]))
+    return query.order_by(News.created_at.desc(), News.id.desc()).limit(per_page + 1)
+
+
+# Default feed order; id breaks ties like the cursor, and matches ix_news_created_at
+FEED_ORDER = (News.created_at.desc(), News.id.desc())
+
+# Public feed orderings besides the default newest-first (?sort=...)
+FEED_SORTS = {
+    'trending': (News.trending_score.desc(), News.created_at.desc()),
+}
+
+# Superadmin "Barcha Yangiliklar" table
+NEWS_TABLE_PER_PAGE = 20
+NEWS_TABLE_SORTS = {
+    'new': (News.created_at.desc(), News.id.desc()),
+    'old': (News.created_at.asc(), News.id.asc()),
+    'title': (News.title.asc(), News.id.asc()),
+}
+
+ADMIN_NEWS_PER_PAGE = 20
+
+# Columns a listing renders; the article body is never read for a list
+NEWS_LISTING = load_only(News.title, News.excerpt, News.image_url, News.image_hash, News.image_widths,
+                         News.created_at, News.updated_at,
+                         News.like_count, News.admin_id, News.region_id, News.category_id)
+
+# Relations rendered on every news card (index.html)
+NEWS_CARD_LOADS = (NEWS_LISTING, joinedload(News.category), joinedload(News.region), joinedload(News.admin))
+
+
+# The listing queries, shared by the views and check-query-plans so the
+# plans checked are the plans served
+def feed_query(search_query='', region_id=None, category_id=None, ranked=True):
+    """Articles of the public feed narrowed by its filters, before paging"""
+    query = News.query
+    if search_query:
+        query = search_news(query, search_query, ranked=ranked)
+    if region_id:
+        query = query.filter(News.region_id == region_id)
+    if category_id:
+        query = query.filter(News.category_id == category_id)
+    return query
+
+
+def feed_page_query(query, sort=None):
+    """feed_query() in page mode: cards loaded, in ?sort= or feed order"""
+    return query.options(*NEWS_CARD_LOADS).order_by(*FEED_SORTS.get(sort, FEED_ORDER))
+
+
+def news_table_query(region_id=None, search_query='', sort='new'):
+    """Superadmin "Barcha Yangiliklar" table"""
+    query = News.query.options(NEWS_LISTING, joinedload(News.admin), joinedload(News.region))
+    if region_id:
+        query = query.filter(News.region_id == region_id)
+    if search_query:
+        query = search_news(query, search_query, ranked=False)
+    return query.order_by(*NEWS_TABLE_SORTS[sort])
+
+
+def admin_news_query(admin_id):
+    """A regional admin's own articles, newest first"""
+    return (News.query.filter_by(admin_id=admin_id)
+                      .options(NEWS_LISTING)
+                      .order_by(News.created_at.desc(), News.id.desc()))
+
+
+# --------------------
+# SCHEMA UPGRADES
+# --------------------
+@cli.command('upgrade-db')
+def upgrade_db():
+    """Bring an existing database up to the current models, in place.
+
+    Creates missing tables and indexes; safe to run any number of times.
+    """
+    db.create_all()
+    added, created = [], []
+    with db.engine.begin() as conn:
+        for tbl in db.metadata.sorted_tables:
+            columns = {col['name'] for col in inspect(conn).get_columns(tbl.name)}
+            for col in tbl.columns:
+                if col.name not in columns:
+                    conn.execute(text('ALTER TABLE %s ADD COLUMN %s' % (tbl.name, CreateColumn(col).compile(conn))))
+                    added.append('%s.%s' % (tbl.name, col.name))
+            existing = {ix['name'] for ix in inspect(conn).get_indexes(tbl.name)}
+            for index in tbl.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+    click.echo('Added columns: %s' % (', '.join(added) or 'none'))
+    click.echo('Created indexes: %s' % (', '.join(created) or 'none'))
+    click.echo('Recounted statistics: %d scopes' % len(reconcile_stats()))
+
+
+@cli.command('backfill-excerpts')
+@click.option('--batch-size', default=500, show_default=True)
+@click.option('--all', 'refresh_all', is_flag=True, help='Recompute existing excerpts too.')
+def backfill_excerpts(batch_size, refresh_all):
+    """Compute News.excerpt for rows written before the column existed."""
+    last_id, total = 0, 0
+    while True:
+        query = db.session.query(News.id, News.content).filter(News.id > last_id)
+        if not refresh_all:
+            query = query.filter(News.excerpt.is_(None))
+        rows = query.order_by(News.id).limit(batch_size).all()
+        if not rows:
+            break
+        db.session.execute(db.update(News), [{'id': news_id, 'excerpt': make_excerpt(content)}
+                                             for news_id, content in rows])
+        db.session.commit()
+        last_id = rows[-1].id
+        total += len(rows)
+    click.echo('Excerpts updated: %d' % total)
+
+
+def public_query_samples():
+    """The statements behind the public and dashboard listings.
+
+    Built with the same functions the views call, so joins, eager loads,
+    search and paging are exactly what a request runs.
+    """
+    some_time = datetime(2024, 1, 1)
+    samples = {
+        'feed': feed_page_query(feed_query()).limit(NEWS_PER_PAGE),
+        'feed page 5': feed_page_query(feed_query()).limit(NEWS_PER_PAGE).offset(4 * NEWS_PER_PAGE),
+        'feed cursor': keyset_query(feed_query().options(*NEWS_CARD_LOADS), (some_time, 1, 'n'), NEWS_PER_PAGE),
+        'feed cursor prev': keyset_query(feed_query().options(*NEWS_CARD_LOADS), (some_time, 1, 'p'),
+                                         NEWS_PER_PAGE),
+        'region feed': feed_page_query(feed_query(region_id=1)).limit(NEWS_PER_PAGE),
+        'category feed': feed_page_query(feed_query(category_id=1)).limit(NEWS_PER_PAGE),
+        'region+category feed': feed_page_query(feed_query(region_id=1, category_id=1)).limit(NEWS_PER_PAGE),
+        'trending feed': feed_page_query(feed_query(), 'trending').limit(NEWS_PER_PAGE),
+        'feed count': count_statement(feed_query()),
+        'region count': count_statement(feed_query(region_id=1)),
+        'category count': count_statement(feed_query(category_id=1)),
+        'search feed': feed_page_query(feed_query('daraxt')).limit(NEWS_PER_PAGE),
+        'search cursor': keyset_query(feed_query('daraxt', ranked=False).options(*NEWS_CARD_LOADS), None,
+                                      NEWS_PER_PAGE),
+        'search count': count_statement(feed_query('daraxt')),
+        'admin dashboard': admin_news_query(1).limit(ADMIN_NEWS_PER_PAGE),
+        'admin dashboard count': count_statement(admin_news_query(1)),
+    }
+    for sort in NEWS_TABLE_SORTS:
+        samples['superadmin table %s' % sort] = news_table_query(sort=sort).limit(NEWS_TABLE_PER_PAGE)
+    samples['superadmin table region'] = news_table_query(region_id=1).limit(NEWS_TABLE_PER_PAGE)
+    samples['superadmin table search'] = news_table_query(search_query='daraxt').limit(NEWS_TABLE_PER_PAGE)
+    samples['superadmin table count'] = count_statement(news_table_query())
+    return samples
+
+
+@cli.command('check-query-plans')
+def check_query_plans():
+    """EXPLAIN QUERY PLAN every listing query; fail if one scans or sorts news.
+
+    A search may sort its matches (by rank or date): FTS bounds that set.
+    Plans follow sqlite_stat1, so run it on a copy of the real database.
+    """
+    failures = 0
+    with db.engine.connect() as conn:
+        if conn.dialect.name != 'sqlite':
+            raise click.ClickException('check-query-plans only understands SQLite plans')
+        for name, query in public_query_samples().items():
+            statement = getattr(query, 'statement', query)
+            sql = str(statement.compile(conn, compile_kwargs={'literal_binds': True}))
+            plan = [row[3] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+            searched = any(step.startswith('SCAN news_fts VIRTUAL TABLE') for step in plan)
+            bad = [step for step in plan
+                   if (step.startswith('SCAN news') and 'INDEX' not in step)
+                   or ('TEMP B-TREE' in step and not searched)]
+            failures += bool(bad)
+            click.echo('%s %s' % ('FAIL' if bad else 'ok  ', name))
+            for step in plan:
+                click.echo('       ' + step)
+    if failures:
+        raise click.ClickException('%d queries do not use an index' % failures)
+
+
+# --------------------
+# AUTH DECORATORS
+# --------------------
+from functools import wraps
+
+def login_required_superadmin(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if 'superadmin_id' not in session:
+            return redirect(url_for('login'))
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def login_required_admin(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if 'admin_id' not in session:
+            return redirect(url_for('login'))
+        return f(*args, **kwargs)
+    return wrapper
+
+
+# --------------------
+# RESPONSE CACHE
+# --------------------
+class LRUCache:
+    """Thread-safe in-process LRU with per-entry TTL and a byte budget."""
+
+    def __init__(self, max_bytes, max_items=None):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None, size=None):
+        size = len(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + ttl if ttl else float('inf')
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, expires, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or (self.max_items and len(self._data) > self.max_items):
+                self._drop(next(iter(self._data)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _drop(self, key):
+        self._bytes -= self._data.pop(key)[2]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return dict(hits=self.hits, misses=self.misses, entries=len(self._data), bytes=self._bytes,
+                    hit_rate=round(self.hits / lookups, 3) if lookups else None)
+
+
+class FileSystemCache:
+    """Cache of byte strings in a local directory, shared by every worker.
+
+    Each entry is one file: an expiry timestamp line followed by the body.
+    Files are written to a temp name and renamed, so readers never see a
+    partial entry. Keys embed content versions, so a bump leaves the old
+    files unread; every sixteenth of the budget written, a sweep deletes
+    expired files and then the oldest ones until the directory is within
+    max_bytes and max_items again. Hit/miss counters are per process.
+    """
+
+    def __init__(self, directory, max_bytes, max_items=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._written_bytes = 0
+        self._written_items = 0
+        self._sweep_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires = float(f.readline())
+                if expires >= time.time():
+                    self.hits += 1
+                    return f.read()
+            os.remove(path)
+        except (OSError, ValueError):
+            pass
+        self.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None):
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        expires = time.time() + ttl if ttl else float('inf')
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'%r\n' % expires)
+            f.write(value)
+        os.replace(tmp_path, path)
+        self._written_bytes += len(value)
+        self._written_items += 1
+        if (self._written_bytes * 16 >= self.max_bytes
+                or (self.max_items and self._written_items * 16 >= self.max_items)):
+            self.sweep()
+
+    def sweep(self):
+        """Delete expired entries, then the oldest until within budget."""
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._written_bytes = self._written_items = 0
+            now = time.time()
+            entries = []
+            for root, _dirs, files in os.walk(self.directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        with open(path, 'rb') as f:
+                            expires = float(f.readline())
+                        info = os.stat(path)
+                    except (OSError, ValueError):
+                        continue  # a temp file being written, or already gone
+                    if expires < now:
+                        self._remove(path)
+                    else:
+                        entries.append((info.st_mtime, info.st_size, path))
+            entries.sort()
+            total = sum(size for _mtime, size, _path in entries)
+            count = len(entries)
+            for _mtime, size, path in entries:
+                if total <= self.max_bytes and not (self.max_items and count > self.max_items):
+                    break
+                self._remove(path)
+                total -= size
+                count -= 1
+        finally:
+            self._sweep_lock.release()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            self.evictions += 1
+        except OSError:
+            pass
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    os.remove(os.path.join(root, name))
+                except OSError:
+                    pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return dict(hits=self.hits, misses=self.misses, evictions=self.evictions, directory=self.directory,
+                    hit_rate=round(self.hits / lookups, 3) if lookups else None)
+
+
+def response_cache():
+    """The configured full-page cache backend, or None when disabled."""
+    if 'response_cache' not in current_app.extensions:
+        backend = current_app.config['RESPONSE_CACHE']
+        if backend == 'memory':
+            cache = LRUCache(current_app.config['RESPONSE_CACHE_MAX_BYTES'],
+                             current_app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+        elif backend == 'filesystem':
+            cache = FileSystemCache(current_app.config['RESPONSE_CACHE_DIR'],
+                                    current_app.config['RESPONSE_CACHE_MAX_BYTES'],
+                                    current_app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+        elif not backend:
+            cache = None
+        else:
+            raise RuntimeError('Unknown RESPONSE_CACHE backend: %r' % backend)
+        current_app.extensions['response_cache'] = cache
+    return current_app.extensions['response_cache']
+
+
+# Query parameters the feed output depends on; anything else is ignored
+PAGE_CACHE_ARGS = ('page', 'cursor', 'q', 'region_id', 'category_id', 'sort')
+
+
+# Content versions a feed page depends on; ?sort=trending adds 'trending'.
+# Like counts are not among them: the page loads them from /api/likes, so a
+# like flush does not throw away every cached page and ETag.
+PAGE_VERSIONS = ('news', 'taxonomy')
+TRENDING_PAGE_VERSIONS = PAGE_VERSIONS + ('trending',)
+
+
+def canonical_url():
+    """Absolute URL of the current page with only the PAGE_CACHE_ARGS kept.
+
+    The page renders this instead of request.url, so tracking parameters
+    (?utm_*, ?fbclid) neither leak into the markup nor split the cache.
+    """
+    args = [(name, request.args[name]) for name in PAGE_CACHE_ARGS if request.args.get(name)]
+    return request.base_url + ('?' + urllib.parse.urlencode(args) if args else '')
+
+
+def page_versions():
+    """The content versions the current feed page depends on."""
+    return TRENDING_PAGE_VERSIONS if request.args.get('sort') == 'trending' else PAGE_VERSIONS
+
+
+def page_cache_key():
+    """Key of the current feed page, including the content versions.
+
+    A write bumps the 'news' or 'taxonomy' version, which moves every
+    worker to fresh keys at once; old entries simply age out. The scheme
+    and host are part of it because the page holds absolute URLs.
+    """
+    versions = cache_versions()
+    parts = [request.host_url, request.path, get_locale()]
+    parts += ['%s=%s' % (name, versions.get(name, 0)) for name in page_versions()]
+    parts += ['%s=%s' % (name, request.args.get(name, '')) for name in PAGE_CACHE_ARGS]
+    return '|'.join(parts)
+
+
+def cached_page(f):
+    """Serve anonymous GETs of a public listing from the response cache."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        cache = response_cache()
+        if (cache is None or 'admin_id' in session or 'superadmin_id' in session
+                or session.get('_flashes')):
+            return f(*args, **kwargs)
+
+        key = page_cache_key()
+        body = cache.get(key)
+        if body is not None:
+            response = make_response(body)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        response = make_response(f(*args, **kwargs))
+        if response.status_code == 200 and not response.direct_passthrough:
+            cache.set(key, response.get_data(), current_app.config['RESPONSE_CACHE_TTL'])
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+def page_validators(names=PAGE_VERSIONS):
+    """(ETag, Last-Modified) of the current listing page or feed.
+
+    Derived from the shared content versions in names, the full URL and
+    the language only, so it costs one primary-key read and no listing
+    query. A first name that was never bumped dates from the newest article.
+    """
+    versions = cache_versions()
+    fingerprint = '|'.join([request.url, get_locale()] +
+                           ['%s=%s' % (name, versions.get(name, 0)) for name in names])
+    etag = hashlib.sha1(fingerprint.encode()).hexdigest()
+
+    changes = [cache_updated_at(name) for name in names]
+    if changes[0] is None:
+        # Nothing bumped the version yet (older database): newest article
+        changes[0] = db.session.query(func.max(News.created_at)).scalar()
+    changes = [change for change in changes if change is not None]
+    last_modified = max(changes).replace(microsecond=0) if changes else None
+    return etag, last_modified
+
+
+def conditional(names=PAGE_VERSIONS, max_age=None):
+    """Answer If-None-Match / If-Modified-Since with 304 before rendering.
+
+    max_age=None makes browsers revalidate every time (no-cache); with
+    max_age shared caches (CDN, proxies) may serve it that many seconds.
+    names may be a function of the view arguments.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if 'admin_id' in session or 'superadmin_id' in session or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            etag, last_modified = page_validators(names(**kwargs) if callable(names) else names)
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = bool(last_modified and request.if_modified_since
+                                    and request.if_modified_since.replace(tzinfo=None) >= last_modified)
+            response = make_response('', 304) if not_modified else make_response(f(*args, **kwargs))
+
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                if last_modified:
+                    response.last_modified = last_modified
+                if max_age is None:
+                    response.cache_control.no_cache = True
+                else:
+                    response.cache_control.public = True
+                    response.cache_control.max_age = max_age
+            return response
+        return wrapper
+    return decorator
+
+
+conditional_page = conditional(lambda **view_args: page_versions())
+
+
+# Rendered article bodies (_news_article.html) keyed by id, version and language
+ARTICLE_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+
+def article_cache():
+    return current_app.extensions['article_cache']
+
+
+def article_cache_key(news, lang):
+    return '%d|%s|%s' % (news.id, (news.updated_at or news.created_at).isoformat(), lang)
+
+
+def forget_article(news):
+    """Drop this worker's cached renderings of an edited or deleted article.
+
+    Other workers never serve them either: an edit changes updated_at, which
+    is part of the key, and a deleted article 404s before the cache lookup.
+    """
+    for lang in LANGUAGES:
+        article_cache().delete(article_cache_key(news, lang))
+
+
+def news_changed(*months):
+    """Call before committing any write that changes what the feed shows.
+
+    months are the YYYYMM sitemap shards the write touched.
+    """
+    bump_cache_version('news')
+    for month in set(months):
+        bump_cache_version('sitemap:%d' % month)
+
+
+# --------------------
+# TEMPLATE FRAGMENT CACHE
+# --------------------
+FRAGMENT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+FRAGMENT_CACHE_MAX_ENTRIES = 20000
+
+
+def fragment_cache():
+    return current_app.extensions['fragment_cache']
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache key[, ttl] %}...{% endcache %} backed by fragment_cache().
+
+    key is any expression, usually a list whose first item names the
+    fragment and whose other items are its invalidation versions, e.g.
+    {% cache ['card', news.id, news.updated_at], 3600 %}. The request
+    language and host are always added to the key, since fragments may hold
+    absolute URLs. ttl is in seconds (None: until evicted).
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        args.append(parser.parse_expression() if parser.stream.skip_if('comma') else nodes.Const(None))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, ttl, caller):
+        parts = list(key) if isinstance(key, (list, tuple)) else [key]
+        context = [get_locale(), request.host_url] if has_request_context() else []
+        cache_key = '|'.join(map(str, parts + context))
+        cache = fragment_cache()
+        stats = current_app.extensions['fragment_stats'].setdefault(str(parts[0]), [0, 0])
+
+        fragment = cache.get(cache_key)
+        if fragment is None:
+            stats[1] += 1
+            fragment = caller()
+            cache.set(cache_key, fragment, ttl, size=len(fragment.encode()))
+        else:
+            stats[0] += 1
+        return fragment
+
+
+def precompile_templates():
+    """Load every template in templates/ into the Jinja environment.
+
+    Compiles (and stores bytecode for) templates that are not in the
+    bytecode cache yet. Returns [(name, milliseconds), ...].
+    """
+    timings = []
+    for name in current_app.jinja_env.list_templates():
+        started = time.perf_counter()
+        current_app.jinja_env.get_template(name)
+        timings.append((name, (time.perf_counter() - started) * 1000))
+    return timings
+
+
+@cli.command('precompile-templates')
+def precompile_templates_command():
+    """Warm the Jinja bytecode cache and report per-template load times."""
+    timings = precompile_templates()
+    for name, ms in sorted(timings, key=lambda item: -item[1]):
+        click.echo('%8.1f ms  %s' % (ms, name))
+    click.echo('%8.1f ms  total, %d templates -> %s' % (
+        sum(ms for _name, ms in timings), len(timings), current_app.config['JINJA_BYTECODE_CACHE_DIR']))
+
+
+def fragment_cache_stats():
+    """Overall fragment_cache() counters plus hit rate per fragment name."""
+    stats = fragment_cache().stats()
+    stats['fragments'] = {name: dict(hits=hits, misses=misses, hit_rate=round(hits / (hits + misses), 3))
+                          for name, (hits, misses) in current_app.extensions['fragment_stats'].items()}
+    return stats
+
+
+# --------------------
+# WRITE-BEHIND COUNTERS
+# --------------------
+class WriteBehind:
+    """Buffers counter writes in memory and stores them in batches.
+
+    A daemon thread flushes every WRITE_BEHIND_INTERVAL seconds, or as
+    soon as WRITE_BEHIND_MAX_PENDING entries are waiting, so a popular
+    article costs one UPDATE per interval instead of one per click. A
+    crash loses at most one interval; a normal exit flushes (atexit).
+    WRITE_BEHIND_INTERVAL=0 writes inline, for tests and scripts.
+
+    The thread also runs the periodic tasks, so it starts with the first
+    request of every worker process (start()), not only on the first add().
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config['WRITE_BEHIND_INTERVAL']
+        self.max_pending = app.config['WRITE_BEHIND_MAX_PENDING']
+        self._channels = {}  # name -> (flush(pending), combine(old, new))
+        self._tasks = []
+        self._pending = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self.flushes = 0
+        self.errors = 0
+        self.last_flush_ms = None
+
+    def register(self, name, flush, combine=lambda old, new: new):
+        self._channels[name] = (flush, combine)
+        self._pending[name] = {}
+
+    def add_task(self, task):
+        """Run task() in the flusher thread after every flush, in an app context"""
+        self._tasks.append(task)
+
+    def add(self, name, key, value):
+        combine = self._channels[name][1]
+        with self._lock:
+            pending = self._pending[name]
+            if key in pending:
+                pending[key] = combine(pending[key], value)
+            else:
+                pending[key] = value
+                self._size += 1
+            full = self._size >= self.max_pending
+        if self.interval <= 0:
+            self.flush()
+        else:
+            self._start()
+            if full:
+                self._wake.set()
+
+    def start(self):
+        """Start this process's flusher thread, unless writes are inline"""
+        if self.interval > 0:
+            self._start()
+
+    def pending(self, name):
+        with self._lock:
+            return dict(self._pending[name])
+
+    def flush(self):
+        with self._lock:
+            batches, self._size = self._pending, 0
+            self._pending = {name: {} for name in self._channels}
+        if not any(batches.values()):
+            return
+        started = time.perf_counter()
+        try:
+            if has_app_context() and current_app._get_current_object() is self.app:
+                self._write(batches)
+            else:
+                with self.app.app_context():
+                    self._write(batches)
+        except Exception:
+            self.errors += 1
+            self._requeue(batches)
+            raise
+        self.flushes += 1
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def _write(self, batches):
+        try:
+            for name, pending in batches.items():
+                if pending:
+                    self._channels[name][0](pending)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _requeue(self, batches):
+        """Put a failed batch back; entries added since then are newer and win"""
+        with self._lock:
+            for name, pending in batches.items():
+                combine = self._channels[name][1]
+                current = self._pending[name]
+                for key, value in pending.items():
+                    if key in current:
+                        current[key] = combine(value, current[key])
+                    else:
+                        current[key] = value
+                        self._size += 1
+
+    def _start(self):
+        # Per process: gunicorn forks workers after the app is created
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name='write-behind', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('write-behind flush failed; retrying next interval')
+            for task in self._tasks:
+                try:
+                    with self.app.app_context():
+                        task()
+                except Exception:
+                    self.app.logger.exception('write-behind task %s failed', task.__name__)
+
+    def stats(self):
+        return dict(pending=self._size, flushes=self.flushes, errors=self.errors,
+                    last_flush_ms=self.last_flush_ms, interval=self.interval)
+
+
+def write_behind():
+    return current_app.extensions['write_behind']
+
+
+def client_id():
+    """Anonymous per-browser id, kept in the session cookie"""
+    if 'client_id' not in session:
+        session['client_id'] = secrets.token_hex(16)
+    return session['client_id']
+
+
+def flush_likes(pending):
+    """pending: {(news_id, client_id): liked}; the last click of a browser wins"""
+    news_ids = {news_id for news_id, _client in pending}
+    existing = set(db.session.scalars(db.select(News.id).where(News.id.in_(news_ids))))
+
+    liked = [{'news_id': news_id, 'client_id': client}
+             for (news_id, client), state in pending.items() if state and news_id in existing]
+    unliked = [key for key, state in pending.items() if not state]
+    if liked:
+        db.session.execute(insert_ignore(NewsLike), liked)
+    if unliked:
+        db.session.execute(db.delete(NewsLike).where(tuple_(NewsLike.news_id, NewsLike.client_id).in_(unliked)))
+
+    # Recount instead of incrementing: replays and duplicate clicks stay exact.
+    # updated_at is kept, a like is not an edit (card and article caches key on it)
+    likes = db.select(func.count()).where(NewsLike.news_id == News.id).scalar_subquery()
+    db.session.execute(db.update(News).where(News.id.in_(existing))
+                         .values(like_count=likes, updated_at=News.updated_at)
+                         .execution_options(synchronize_session=False))
+    bump_cache_version('likes')
+
+
+def view_hour(moment=None):
+    return (moment or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+
+
+def record_view(news_id):
+    """Count a page view without a write in the request: buffered, optionally sampled"""
+    every = current_app.config['VIEW_SAMPLE_EVERY']
+    if every <= 1 or random.randrange(every) == 0:
+        write_behind().add('views', (news_id, view_hour()), max(every, 1))
+
+
+def flush_views(pending):
+    """pending: {(news_id, hour): views}; one upsert into news_view_hour per batch"""
+    news_ids = {news_id for news_id, _hour in pending}
+    existing = set(db.session.scalars(db.select(News.id).where(News.id.in_(news_ids))))
+    rows = [{'news_id': news_id, 'hour': hour, 'views': views}
+            for (news_id, hour), views in pending.items() if news_id in existing]
+    if not rows:
+        return
+
+    insert = dialect_insert(NewsViewHour)
+    db.session.execute(insert.on_conflict_do_update(
+        index_elements=['news_id', 'hour'], set_={'views': NewsViewHour.views + insert.excluded.views}), rows)
+
+    totals = {}
+    for row in rows:
+        totals[row['news_id']] = totals.get(row['news_id'], 0) + row['views']
+    news = News.__table__
+    db.session.execute(news.update().where(news.c.id == db.bindparam('news_id'))
+                           .values(view_count=news.c.view_count + db.bindparam('views'), updated_at=news.c.updated_at),
+                       [{'news_id': news_id, 'views': views} for news_id, views in totals.items()])
+
+
+# Marks the last refresh_trending() run; 'trending' itself is only bumped
+# when the ranking changed, so cached ?sort=trending pages survive idle runs
+TRENDING_REFRESHED = 'trending-refresh'
+
+
+def refresh_trending(now=None):
+    """Recompute News.trending_score from the hourly view buckets.
+
+    Every article decays by the same factor over time, so the order only
+    changes when views arrive; a refresh every few minutes is enough.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    half_life = config['TRENDING_HALF_LIFE_HOURS'] * 3600
+    buckets = db.session.execute(
+        db.select(NewsViewHour.news_id, NewsViewHour.hour, NewsViewHour.views)
+          .where(NewsViewHour.hour >= now - timedelta(hours=config['TRENDING_WINDOW_HOURS'])))
+
+    scores = {}
+    for news_id, hour, views in buckets:
+        age = max((now - hour).total_seconds() - 1800, 0)  # middle of the hour
+        scores[news_id] = scores.get(news_id, 0) + views * 0.5 ** (age / half_life)
+
+    ranking = db.select(News.id).where(News.trending_score > 0).order_by(*FEED_SORTS['trending'])
+    before = db.session.scalars(ranking).all()
+    news = News.__table__
+    db.session.execute(news.update().where(news.c.trending_score > 0)
+                           .values(trending_score=0, updated_at=news.c.updated_at))
+    if scores:
+        db.session.execute(news.update().where(news.c.id == db.bindparam('news_id'))
+                               .values(trending_score=db.bindparam('score'), updated_at=news.c.updated_at),
+                           [{'news_id': news_id, 'score': score} for news_id, score in scores.items()])
+    db.session.execute(db.delete(NewsViewHour)
+                         .where(NewsViewHour.hour < now - timedelta(days=config['VIEW_BUCKET_DAYS'])))
+    if db.session.scalars(ranking).all() != before:
+        bump_cache_version('trending')
+    bump_cache_version(TRENDING_REFRESHED)
+    db.session.commit()
+    return len(scores)
+
+
+def refresh_trending_if_due():
+    """Flusher task: the first worker past TRENDING_REFRESH_SECONDS refreshes for all"""
+    last = cache_updated_at(TRENDING_REFRESHED)
+    if last is None or (datetime.utcnow() - last).total_seconds() >= current_app.config['TRENDING_REFRESH_SECONDS']:
+        refresh_trending()
+
+
+@cli.command('refresh-trending')
+def refresh_trending_command():
+    """Recompute trending scores now (the flusher also does it every few minutes)."""
+    click.echo('Trending scores for %d articles' % refresh_trending())
+
+
+# --------------------
+# STATISTICS
+# --------------------
+# Month of created_at as YYYYMM, the same number month_key() gives in Python
+NEWS_MONTH = cast(extract('year', News.created_at) * 100 + extract('month', News.created_at), Integer)
+
+
+def month_key(moment):
+    return moment.year * 100 + moment.month
+
+
+def month_range(key):
+    """[start, end) of the YYYYMM month key"""
+    start = datetime(key // 100, key % 100, 1)
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+def stat_scopes(region_id=None, category_id=None, created_at=None):
+    """Scopes an article (or admin) counts in: the site, its region, its category, its month"""
+    scopes = [('all', 0)]
+    if region_id:
+        scopes.append(('region', int(region_id)))
+    if category_id:
+        scopes.append(('category', int(category_id)))
+    if created_at:
+        scopes.append(('month', month_key(created_at)))
+    return scopes
+
+
+def adjust_stats(scopes, news=0, admins=0, latest=None):
+    """Add deltas to the counters of scopes (one upsert, same transaction as the write)"""
+    add_stats([{'scope': scope, 'scope_id': scope_id, 'news_count': news, 'admin_count': admins, 'latest_news_at': latest}
+               for scope, scope_id in scopes])
+
+
+def add_stats(rows):
+    """adjust_stats() with separate deltas per scope, as one executemany upsert"""
+    insert = dialect_insert(ScopeStat)
+    stat = ScopeStat.__table__.c
+    newer = stat.latest_news_at.is_(None) | (stat.latest_news_at < insert.excluded.latest_news_at)
+    db.session.execute(insert.on_conflict_do_update(
+        index_elements=['scope', 'scope_id'],
+        set_={'news_count': stat.news_count + insert.excluded.news_count,
+              'admin_count': stat.admin_count + insert.excluded.admin_count,
+              'latest_news_at': case((newer, insert.excluded.latest_news_at), else_=stat.latest_news_at)}),
+        rows)
+    bump_cache_version('stats')
+
+
+def refresh_latest(scopes):
+    """latest_news_at after a removal: MAX(created_at) read from the scope's index"""
+    db.session.flush()
+    stat = ScopeStat.__table__
+    columns = {'region': News.region_id, 'category': News.category_id}
+    for scope, scope_id in scopes:
+        latest = db.select(func.max(News.created_at))
+        if scope in columns:
+            latest = latest.where(columns[scope] == scope_id)
+        elif scope == 'month':
+            start, end = month_range(scope_id)
+            latest = latest.where(News.created_at >= start, News.created_at < end)
+        db.session.execute(stat.update().where(stat.c.scope == scope, stat.c.scope_id == scope_id)
+                                        .values(latest_news_at=latest.scalar_subquery()))
+
+
+def news_added(news):
+    db.session.flush()  # created_at is filled in on INSERT
+    adjust_stats(stat_scopes(news.region_id, news.category_id, news.created_at), news=1, latest=news.created_at)
+
+
+def news_removed(news):
+    scopes = stat_scopes(news.region_id, news.category_id, news.created_at)
+    adjust_stats(scopes, news=-1)
+    refresh_latest(scopes)
+
+
+def reconcile_stats():
+    """Recount every scope from the base tables; returns the scopes that had drifted"""
+    # Keep adjust_stats() writers out until the commit, so a delta committed
+    # between the recount and the upsert below is not overwritten. SQLite
+    # takes its one write lock with the first write; PostgreSQL needs a table
+    # lock that conflicts with their upserts.
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(text('LOCK TABLE scope_stat IN SHARE ROW EXCLUSIVE MODE'))
+    bump_cache_version('stats_reconciled')
+    stored = {(row.scope, row.scope_id): [row.news_count, row.admin_count, row.latest_news_at]
+              for row in ScopeStat.query}
+    truth = {('all', 0): [0, 0, None]}
+    # Emptied months keep their row; only months that never had news are absent
+    truth.update({key: [0, 0, None] for key in stored if key[0] == 'month'})
+    truth.update({('region', region_id): [0, 0, None] for region_id in db.session.scalars(db.select(Region.id))})
+    truth.update({('category', category_id): [0, 0, None]
+                  for category_id in db.session.scalars(db.select(Category.id))})
+
+    truth[('all', 0)][0::2] = db.session.execute(db.select(func.count(), func.max(News.created_at))).one()
+    for scope, scope_column in (('region', News.region_id), ('category', News.category_id)):
+        for scope_id, count, latest in db.session.execute(
+                db.select(scope_column, func.count(), func.max(News.created_at)).group_by(scope_column)):
+            if (scope, scope_id) in truth:
+                truth[(scope, scope_id)][0::2] = count, latest
+    for month, count, latest in db.session.execute(
+            db.select(NEWS_MONTH, func.count(), func.max(News.created_at)).group_by(NEWS_MONTH)):
+        truth[('month', month)] = [count, 0, latest]
+    truth[('all', 0)][1] = db.session.scalar(db.select(func.count()).select_from(Admin))
+    for region_id, count in db.session.execute(db.select(Admin.region_id, func.count()).group_by(Admin.region_id)):
+        if ('region', region_id) in truth:
+            truth[('region', region_id)][1] = count
+
+    drifted = sorted(key for key, values in truth.items() if stored.get(key) != values)
+    removed = [key for key in stored if key not in truth]
+
+    if removed:
+        db.session.execute(db.delete(ScopeStat).where(tuple_(ScopeStat.scope, ScopeStat.scope_id).in_(removed)))
+    if drifted:
+        insert = dialect_insert(ScopeStat)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=['scope', 'scope_id'],
+            set_={name: insert.excluded[name] for name in ('news_count', 'admin_count', 'latest_news_at')}),
+            [{'scope': scope, 'scope_id': scope_id, 'news_count': news, 'admin_count': admins, 'latest_news_at': latest}
+             for (scope, scope_id), (news, admins, latest) in ((key, truth[key]) for key in drifted)])
+    if drifted or removed:
+        bump_cache_version('stats')
+    db.session.commit()
+    return drifted + removed
+
+
+def reconcile_stats_if_due():
+    """Flusher task, at most once per STATS_RECONCILE_SECONDS across workers"""
+    last = cache_updated_at('stats_reconciled')
+    if last is None or (datetime.utcnow() - last).total_seconds() >= current_app.config['STATS_RECONCILE_SECONDS']:
+        drifted = reconcile_stats()
+        if drifted:
+            current_app.logger.warning('scope_stat drifted and was fixed: %s', drifted)
+
+
+@cli.command('reconcile-stats')
+def reconcile_stats_command():
+    """Recount scope_stat from news/admin/region/category and fix any drift."""
+    drifted = reconcile_stats()
+    click.echo('Fixed %d scopes%s' % (len(drifted), ': ' + ', '.join('%s %s' % key for key in drifted) if drifted else ''))
+
+
+def scope_stats():
+    return {(row.scope, row.scope_id): row for row in ScopeStat.query}
+
+
+def stats_payload():
+    """/api/stats body, rebuilt when the 'stats' or 'taxonomy' version moves.
+
+    Both count: the payload embeds region and category names and slugs.
+    """
+    versions = cache_versions()
+    version = (versions.get('stats', 0), versions.get('taxonomy', 0))
+    cache = current_app.extensions['stats_cache']
+    if cache.get('version') != version:
+        stats = scope_stats()
+        regions, categories = cached_taxonomy()
+
+        def entry(key, admins=True, **fields):
+            stat = stats.get(key)
+            fields['news_count'] = stat.news_count if stat else 0
+            if admins:
+                fields['admin_count'] = stat.admin_count if stat else 0
+            fields['latest_news_at'] = stat.latest_news_at.isoformat() if stat and stat.latest_news_at else None
+            return fields
+
+        payload = entry(('all', 0), region_count=len(regions), category_count=len(categories))
+        payload['regions'] = [entry(('region', r.id), id=r.id, name=r.name, slug=r.slug) for r in regions]
+        payload['categories'] = [entry(('category', c.id), admins=False, id=c.id, name=c.name, slug=c.slug)
+                                 for c in categories]
+        cache.update(version=version, payload=payload)
+    return cache['payload']
+
+
+# --------------------
+# FEEDS (RSS 2.0, JSON Feed 1.1)
+# --------------------
+FEED_SIZE = 50
+FEED_CHUNK = 20  # rows fetched from the cursor at a time
+FEED_MAX_AGE = 300  # seconds a shared cache may serve a feed without asking
+FEED_VERSIONS = ('news', 'taxonomy')  # likes/views do not change a feed
+FEED_TYPES = {
+    'xml': 'application/rss+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+
+
+def feed_rows(region_id=None, category_id=None):
+    """Newest articles, streamed from the cursor instead of built as a list"""
+    stmt = (db.select(News.id, News.title, News.excerpt, News.created_at, News.updated_at,
+                      News.category_id, Admin.username)
+              .outerjoin(Admin, Admin.id == News.admin_id)
+              .order_by(News.created_at.desc(), News.id.desc())
+              .limit(FEED_SIZE))
+    if region_id:
+        stmt = stmt.where(News.region_id == region_id)
+    if category_id:
+        stmt = stmt.where(News.category_id == category_id)
+    return db.session.execute(stmt.execution_options(yield_per=FEED_CHUNK))
+
+
+def feed_language():
+    return get_locale().replace('_cyrl', '-Cyrl')
+
+
+def feed_item_url(row):
+    return url_for('news_detail', news_id=row.id, slug=slugify(row.title), _external=True)
+
+
+def rss_feed(rows, title, link):
+    category_names = {c.id: c.name for c in cached_taxonomy()[1]}
+    esc = html.escape
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+           '<channel>\n<title>%s</title>\n<link>%s</link>\n<description>%s</description>\n<language>%s</language>\n'
+           '<atom:link href="%s" rel="self" type="application/rss+xml"/>\n'
+           % (esc(title), esc(link), esc(title), feed_language(), esc(request.url)))
+    for row in rows:
+        url = esc(feed_item_url(row))
+        category = category_names.get(row.category_id)
+        yield ('<item>\n<title>%s</title>\n<link>%s</link>\n<guid isPermaLink="true">%s</guid>\n'
+               '<pubDate>%s</pubDate>\n<dc:creator>%s</dc:creator>\n%s<description>%s</description>\n</item>\n'
+               % (esc(row.title), url, url, format_datetime(row.created_at.replace(tzinfo=timezone.utc), usegmt=True),
+                  esc(row.username or ''), '<category>%s</category>\n' % esc(category) if category else '',
+                  esc(row.excerpt or '')))
+    yield '</channel>\n</rss>\n'
+
+
+def json_feed(rows, title, link):
+    category_names = {c.id: c.name for c in cached_taxonomy()[1]}
+    head = json.dumps({'version': 'https://jsonfeed.org/version/1.1', 'title': title, 'home_page_url': link,
+                       'feed_url': request.url, 'language': feed_language()}, ensure_ascii=False)
+    yield head[:-1] + ', "items": [\n'
+    for n, row in enumerate(rows):
+        item = {
+            'id': str(row.id),
+            'url': feed_item_url(row),
+            'title': row.title,
+            'content_text': row.excerpt or '',
+            'date_published': row.created_at.isoformat() + 'Z',
+            'date_modified': (row.updated_at or row.created_at).isoformat() + 'Z',
+            'authors': [{'name': row.username}] if row.username else [],
+            'tags': [category_names[row.category_id]] if row.category_id in category_names else [],
+        }
+        yield (',\n' if n else '') + json.dumps(item, ensure_ascii=False)
+    yield '\n]}\n'
+
+
+def feed_response(fmt, title, link, **filters):
+    generate = rss_feed if fmt == 'xml' else json_feed
+    return Response(stream_with_context(generate(feed_rows(**filters), title, link)),
+                    content_type=FEED_TYPES[fmt])
 
-os.makedirs(INSTANCE_DIR, exist_ok=True)
 
 # --------------------
-# APP CONFIG
+# SITEMAPS
 # --------------------
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
+# /sitemap.xml lists one shard per month of created_at; a shard is rebuilt
+# only after a write bumps its 'sitemap:YYYYMM' version (news_changed)
+SITEMAP_MAX_AGE = 3600
+SITEMAP_CHUNK = 500
+SITEMAP_CACHE_MAX_BYTES = 16 * 1024 * 1024
+SITEMAP_TYPE = 'application/xml; charset=utf-8'
+SITEMAP_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n<%s xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
 
-# -------------------- 
-# SIMPLE MULTI-LANGUAGE SUPPORT
-# -------------------- 
-def _(text):
-    """Simple translation function"""
-    lang = session.get('language', 'uz')
-    
-    translations = {
-        'uz': {
-            'Yangiliklar sayti': 'EcoNews - Ekologik Yangiliklar',
-            'EcoNews': 'EcoNews',
-            'So\'nggi ekologik yangiliklar': 'So\'nggi ekologik yangiliklar',
-            'O\'rmonlar va yashil hududlar haqida eng so\'nggi ma\'lumotlar': 'O\'rmonlar va yashil hududlar haqida eng so\'nggi ma\'lumotlar',
-            'Yangiliklarni ko\'rish': 'Yangiliklarni ko\'rish',
-            'Statistika': 'Statistika',
-            'Hozircha yangiliklar yo\'q': 'Hozircha yangiliklar yo\'q',
-            'Tabiat uyg\'onmoqda... Tez orada yangiliklar bo\'ladi.': 'Tabiat uyg\'onmoqda... Tez orada yangiliklar bo\'ladi.',
-            'To\'liq o\'qish': 'To\'liq o\'qish',
-            'Yoqdi': 'Yoqdi',
-            'Ulashish': 'Ulashish',
-            'SuperAdmin Panel': 'SuperAdmin Panel',
-            'Jami hududlar': 'Jami hududlar',
-            'Jami adminlar': 'Jami adminlar',
-            'Jami yangiliklar': 'Jami yangiliklar',
-            'Kategoriyalar': 'Kategoriyalar',
-            'Hudud qo\'shish': 'Hudud qo\'shish',
-            'Admin qo\'shish': 'Admin qo\'shish',
-            'Hududlar': 'Hududlar',
-            'Adminlar soni': 'Adminlar soni',
-            'Yangiliklar soni': 'Yangiliklar soni',
-            'Barcha Yangiliklar': 'Barcha Yangiliklar',
-            'Username': 'Username',
-            'Hudud': 'Hudud',
-            'Sarlavha': 'Sarlavha',
-            'Muallif': 'Muallif',
-            'Sana': 'Sana',
-            'Amallar': 'Amallar',
-            'Rostdan ham o\'chirmoqchimisiz?': 'Rostdan ham o\'chirmoqchimisiz?'
-        },
-        'uz_cyrl': {
-            'Yangiliklar sayti': 'EcoNews - Экологик Янгиликлар',
-            'EcoNews': 'EcoNews',
-            'So\'nggi ekologik yangiliklar': 'Сўнги экологик янгиликлар',
-            'O\'rmonlar va yashil hududlar haqida eng so\'nggi ma\'lumotlar': 'Ўрмонлар ва яшил ҳудудлар ҳақида энг сўнги маълумотлар',
-            'Yangiliklarni ko\'rish': 'Янгиликларни кўриш',
-            'Statistika': 'Статистика',
-            'Hozircha yangiliklar yo\'q': 'Ҳозирча янгиликлар йўқ',
-            'Tabiat uyg\'onmoqda... Tez orada yangiliklar bo\'ladi.': 'Табиат уйғонмоқда... Тез орада янгиликлар бўлади.',
-            'To\'liq o\'qish': 'Тўлиқ ўқиш',
-            'Yoqdi': 'Ўқди',
-            'Ulashish': 'Улашиш',
-            'SuperAdmin Panel': 'SuperAdmin Панел',
-            'Jami hududlar': 'Жами ҳудудлар',
-            'Jami adminlar': 'Жами администраторлар',
-            'Jami yangiliklar': 'Жами янгиликлар',
-            'Kategoriyalar': 'Категориялар',
-            'Hudud qo\'shish': 'Ҳудуд қўшиш',
-            'Admin qo\'shish': 'Администратор қўшиш',
-            'Hududlar': 'Ҳудудлар',
-            'Adminlar soni': 'Администраторлар сони',
-            'Yangiliklar soni': 'Янгиликлар сони',
-            'Barcha Yangiliklar': 'Барча Янгиликлар',
-            'Username': 'Фойдаланувчи номи',
-            'Hudud': 'Ҳудуд',
-            'Sarlavha': 'Сарлавҳа',
-            'Muallif': 'Муаллиф',
-            'Sana': 'Сана',
-            'Amallar': 'Амаллар',
-            'Rostdan ham o\'chirmoqchimisiz?': 'Ростдан ҳам ўчирмоқчимисиз?'
-        }
-    }
-    
-    return translations.get(lang, {}).get(text, text)
 
-def get_locale():
-    # URL dan tilni olish
-    if request.args.get('lang'):
-        session['language'] = request.args.get('lang')
-    return session.get('language', 'uz')
+def sitemap_cache():
+    return current_app.extensions['sitemap_cache']
+
+
+def sitemap_lastmod(moment):
+    return moment.replace(microsecond=0).isoformat() + '+00:00'
+
+
+def sitemap_months():
+    """(YYYYMM, lastmod) of every month with articles, oldest first"""
+    months = []
+    for stat in (ScopeStat.query.filter(ScopeStat.scope == 'month', ScopeStat.news_count > 0)
+                                .order_by(ScopeStat.scope_id)):
+        changed = cache_updated_at('sitemap:%d' % stat.scope_id)
+        months.append((stat.scope_id, max(filter(None, (stat.latest_news_at, changed)))))
+    return months
+
 
-# SQLite (Render uchun to‘g‘ri joy)
-db_path = os.path.join(INSTANCE_DIR, 'news.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+def sitemap_shard(key):
+    """<urlset> of one month, streamed from an index range scan on created_at"""
+    start, end = month_range(key)
+    rows = db.session.execute(
+        db.select(News.id, News.title, News.created_at, News.updated_at)
+          .where(News.created_at >= start, News.created_at < end)
+          .order_by(News.created_at, News.id)
+          .execution_options(yield_per=SITEMAP_CHUNK))
+    yield SITEMAP_HEAD % 'urlset'
+    for row in rows:
+        yield '<url><loc>%s</loc><lastmod>%s</lastmod></url>\n' % (
+            html.escape(feed_item_url(row)), sitemap_lastmod(row.updated_at or row.created_at))
+    yield '</urlset>\n'
+
+
+def cached_stream(cache, key, chunks):
+    """Pass chunks through to the client, then keep the complete body in cache"""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    body = ''.join(parts).encode()
+    cache.set(key, body, size=len(body))
 
-db = SQLAlchemy(app)
 
 # --------------------
-# MODELS
+# BULK IMPORT (CSV / JSONL)
 # --------------------
-class SuperAdmin(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+IMPORT_BATCH = 500
+IMPORT_FORMATS = ('csv', 'jsonl', 'json')  # json: one array of objects, read into memory whole
+IMPORT_EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'json'}
+IMPORT_SHOWN_ERRORS = 50
+IMPORT_TEXT_FIELDS = ('title', 'content', 'image_url', 'created_at')
+IMPORT_REFERENCE_FIELDS = ('admin', 'region', 'category')  # name, slug/username or id
 
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
 
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+def file_format(filename):
+    return IMPORT_EXTENSIONS.get(os.path.splitext(filename or '')[1].lower(), 'csv')
 
 
-class Region(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), unique=True, nullable=False)
-    slug = db.Column(db.String(100), unique=True, nullable=False)
+def import_records(stream, fmt):
+    """(line number, record) pairs; record is None where a JSONL line is not JSON.
 
+    For a JSON array the "line" is the position of the record in the array.
+    """
+    if fmt == 'json':
+        document = json.load(stream)
+        yield from enumerate(document if isinstance(document, list) else [document], 1)
+        return
+    if fmt == 'csv':
+        csv.field_size_limit(max(csv.field_size_limit(), 16 * 1024 * 1024))  # whole articles in one cell
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
 
-class Admin(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
-    region_id = db.Column(db.Integer, db.ForeignKey('region.id'), nullable=False)
 
-    region = db.relationship('Region', backref='admins')
+class ImportLookups:
+    """Regions, admins and categories by id, slug/username or name, read once per import"""
 
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+    def __init__(self):
+        self.regions = {}
+        for region in Region.query:
+            self.regions.update(dict.fromkeys((str(region.id), region.slug.lower(), region.name.lower()), region.id))
+        self.categories = {}
+        for category in Category.query:
+            self.categories.update(dict.fromkeys((str(category.id), category.slug.lower(), category.name.lower()),
+                                                 category.id))
+        self.admins = {}
+        for admin in Admin.query:
+            self.admins.update(dict.fromkeys((str(admin.id), admin.username.lower()), (admin.id, admin.region_id)))
 
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+    @staticmethod
+    def find(table, value, what):
+        found = table.get(str(value).strip().lower())
+        if found is None:
+            raise ValueError('unknown %s %r' % (what, value))
+        return found
 
 
-class Category(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), unique=True, nullable=False)
-    slug = db.Column(db.String(100), unique=True, nullable=False)
-    description = db.Column(db.Text)
-    icon = db.Column(db.String(50))  # Font Awesome icon class
+def import_datetime(value):
+    """created_at as naive UTC, from ISO 8601 with or without an offset"""
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError('created_at %r is not an ISO 8601 date' % value)
+    if moment.tzinfo:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
 
 
-class News(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
-    image_url = db.Column(db.String(500))  # Rasm URL saqlash uchun
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+def import_id(value):
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError('id must be a positive integer, not %r' % (value,))
+    return value
 
-    admin_id = db.Column(db.Integer, db.ForeignKey('admin.id'), nullable=False)
-    region_id = db.Column(db.Integer, db.ForeignKey('region.id'), nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
 
-    admin = db.relationship('Admin', backref='news')
-    region = db.relationship('Region', backref='news')
-    category = db.relationship('Category', backref='news')
+def import_row(record, lookups):
+    """Check one record and turn it into a news row; ValueError says what is wrong"""
+    if not isinstance(record, dict):
+        raise ValueError('not a JSON object')
+    fields = {name: value.strip() if isinstance(value, str) else value
+              for name, value in record.items() if name and value not in (None, '')}
+    for name in IMPORT_TEXT_FIELDS:
+        if name in fields and not isinstance(fields[name], str):
+            raise ValueError('%s must be a string, not %s' % (name, type(fields[name]).__name__))
+    for name in IMPORT_REFERENCE_FIELDS:
+        if name in fields and (isinstance(fields[name], bool) or not isinstance(fields[name], (str, int))):
+            raise ValueError('%s must be a name or an id, not %s' % (name, type(fields[name]).__name__))
+
+    title, content = fields.get('title'), fields.get('content')
+    if not title:
+        raise ValueError('title is required')
+    if len(title) > News.title.type.length:
+        raise ValueError('title is longer than %d characters' % News.title.type.length)
+    if not content:
+        raise ValueError('content is required')
+    if 'admin' not in fields:
+        raise ValueError('admin is required')
+    admin_id, region_id = lookups.find(lookups.admins, fields['admin'], 'admin')
+    if 'region' in fields:
+        region_id = lookups.find(lookups.regions, fields['region'], 'region')
+    category_id = lookups.find(lookups.categories, fields['category'], 'category') if 'category' in fields else None
+    image_url = fields.get('image_url')
+    if image_url and len(image_url) > News.image_url.type.length:
+        raise ValueError('image_url is longer than %d characters' % News.image_url.type.length)
+    created_at = import_datetime(fields['created_at']) if 'created_at' in fields else datetime.utcnow()
+
+    row = {'title': title, 'content': content, 'excerpt': make_excerpt(content), 'image_url': image_url,
+           'created_at': created_at, 'updated_at': created_at,
+           'admin_id': admin_id, 'region_id': region_id, 'category_id': category_id}
+    if 'id' in fields:
+        row['id'] = import_id(fields['id'])
+    return row
+
+
+def insert_news_rows(rows):
+    """One executemany INSERT, then the counters, sitemap months and versions once for all rows.
+
+    The news_fts triggers index the rows inside the same statement.
+    """
+    with_ids = [row for row in rows if 'id' in row]
+    for group in (with_ids, [row for row in rows if 'id' not in row]):
+        if group:
+            db.session.execute(db.insert(News), group)
+    if with_ids and db.session.get_bind().dialect.name == 'postgresql':
+        # Explicit ids do not advance the sequence; move it past them
+        db.session.execute(text("SELECT setval(pg_get_serial_sequence('news', 'id'), (SELECT MAX(id) FROM news))"))
+    deltas = {}
+    for row in rows:
+        for scope in stat_scopes(row['region_id'], row['category_id'], row['created_at']):
+            count, latest = deltas.get(scope, (0, row['created_at']))
+            deltas[scope] = count + 1, max(latest, row['created_at'])
+    add_stats([{'scope': scope, 'scope_id': scope_id, 'news_count': count, 'admin_count': 0, 'latest_news_at': latest}
+               for (scope, scope_id), (count, latest) in deltas.items()])
+    news_changed(*{month_key(row['created_at']) for row in rows})
+
+
+class ImportReport:
+    """What an import did: rows read, inserted and already present, (line, reason) of every rejected row"""
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return 'Imported %d of %d rows in %.2f s (%.0f rows/s), %d already present, %d rejected' % (
+            self.inserted, self.read, self.seconds, self.rows_per_second, self.skipped, len(self.errors))
+
+
+def drop_existing(batch, report):
+    """batch without rows whose id is taken.
+
+    The same article (same id and created_at, e.g. an export loaded twice)
+    counts as skipped; an id held by a different article is an error.
+    """
+    ids = [row['id'] for _line, row in batch if 'id' in row]
+    if not ids:
+        return batch
+    taken = dict(db.session.execute(db.select(News.id, News.created_at).where(News.id.in_(ids))).all())
+    kept = []
+    for line, row in batch:
+        if row.get('id') not in taken:
+            kept.append((line, row))
+        elif taken[row['id']] == row['created_at']:
+            report.skipped += 1
+        else:
+            report.errors.append((line, 'id %d belongs to another article' % row['id']))
+    return kept
+
+
+def import_batch(batch, report):
+    """Commit a batch of (line, row); if the database refuses it, retry row by row"""
+    batch = drop_existing(batch, report)
+    if not batch:
+        return
+    try:
+        insert_news_rows([row for _line, row in batch])
+        db.session.commit()
+        report.inserted += len(batch)
+        return
+    except SQLAlchemyError:
+        db.session.rollback()
+    for line, row in batch:
+        try:
+            insert_news_rows([row])
+            db.session.commit()
+            report.inserted += 1
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            report.errors.append((line, 'database error: %s' % getattr(e, 'orig', e)))
+
+
+def import_news(stream, fmt, batch_size=IMPORT_BATCH):
+    """Load news from a CSV/JSONL text stream, batch_size rows per transaction.
+
+    Rows are read and checked one at a time, so memory stays at one batch
+    whatever the file size. Rejected rows are reported and skipped.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    lookups = ImportLookups()
+    batch = []
+    try:
+        for line, record in import_records(stream, fmt):
+            report.read += 1
+            try:
+                batch.append((line, import_row(record, lookups)))
+            except ValueError as e:
+                report.errors.append((line, str(e)))
+            if len(batch) >= batch_size:
+                import_batch(batch, report)
+                batch = []
+    except (csv.Error, json.JSONDecodeError, UnicodeDecodeError) as e:
+        report.errors.append((report.read + 1, 'unreadable file, import stopped: %s' % e))
+    if batch:
+        import_batch(batch, report)
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+@cli.command('import-news')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), help='Default: from the file extension.')
+@click.option('--batch-size', default=IMPORT_BATCH, show_default=True, help='Rows per INSERT and commit.')
+def import_news_command(path, fmt, batch_size):
+    """Bulk-load news from CSV or JSONL.
+
+    Columns: title, content, admin (username or id), and optionally region,
+    category (slug, name or id), image_url, created_at (ISO 8601) and id
+    (kept; rows of an earlier export that are already present are skipped).
+    """
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = import_news(stream, fmt or file_format(path), batch_size)
+    click.echo(report.summary())
+    for line, message in report.errors[:IMPORT_SHOWN_ERRORS]:
+        click.echo('  line %s: %s' % (line, message))
+    if len(report.errors) > IMPORT_SHOWN_ERRORS:
+        click.echo('  ... and %d more' % (len(report.errors) - IMPORT_SHOWN_ERRORS))
 
 
 # --------------------
-# DATABASE INIT (ENG MUHIM QISM)
+# EXPORT (CSV / JSONL, optionally gzip)
 # --------------------
-with app.app_context():
-    db.create_all()
+EXPORT_CHUNK = 1000
+EXPORT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+# The same columns import-news reads, so an export can be loaded back
+EXPORT_COLUMNS = ('id', 'title', 'content', 'admin', 'region', 'category', 'image_url', 'created_at', 'updated_at')
 
-    # SuperAdmin avtomatik yaratiladi (agar yo‘q bo‘lsa)
-    if not SuperAdmin.query.filter_by(username='superadmin').first():
-        sa = SuperAdmin(username='superadmin')
-        sa.set_password('admin123')
-        db.session.add(sa)
-        db.session.commit()
-        print("SuperAdmin created: superadmin / admin123")
-    
-    # Default kategoriyalarni yaratish
-    default_categories = [
-        {'name': 'O\'rmonlarni ko\'paytirish', 'slug': 'forestation', 'icon': 'fas fa-tree'},
-        {'name': 'Yashil hududlar', 'slug': 'green-areas', 'icon': 'fas fa-leaf'},
-        {'name': 'Cho\'llanishga qarshi kurash', 'slug': 'desertification', 'icon': 'fas fa-sun'},
-        {'name': 'Ekologik ta\'lim', 'slug': 'eco-education', 'icon': 'fas fa-graduation-cap'},
-        {'name': 'Xalqaro hamkorlik', 'slug': 'international', 'icon': 'fas fa-globe'},
-        {'name': 'Yoshlar siyosati', 'slug': 'youth-policy', 'icon': 'fas fa-users'},
-    ]
-    
-    for cat_data in default_categories:
-        if not Category.query.filter_by(slug=cat_data['slug']).first():
-            category = Category(
-                name=cat_data['name'],
-                slug=cat_data['slug'],
-                icon=cat_data['icon']
-            )
-            db.session.add(category)
-    
-    db.session.commit()
-    print("Default categories created")
+
+def export_date(value):
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+# Export filter -> parser of its query-string value
+EXPORT_FILTERS = {'region_id': int, 'category_id': int, 'date_from': export_date, 'date_to': export_date}
+
+
+def export_filters(args):
+    """export_chunks() filters from request args; ValueError names a malformed one.
+
+    Dropping a filter that does not parse would export the whole archive.
+    """
+    filters = {}
+    for name, parse in EXPORT_FILTERS.items():
+        if args.get(name):
+            try:
+                filters[name] = parse(args[name])
+            except ValueError:
+                raise ValueError('%s: %r is not %s' % (
+                    name, args[name], 'a date (YYYY-MM-DD)' if parse is export_date else 'an id'))
+    return filters
+
+
+def export_chunks(region_id=None, category_id=None, date_from=None, date_to=None, chunk_size=EXPORT_CHUNK):
+    """Rows to export, oldest first, chunk_size at a time.
+
+    Keyset pages on (created_at, id), each read in its own short transaction
+    with the connection returned in between: a slow download holds neither
+    a pooled connection nor an SQLite read snapshot (which would stall WAL
+    checkpoints) while the client catches up. date_to is inclusive.
+    """
+    stmt = (db.select(News.id, News.title, News.content, Admin.username.label('admin'), Region.slug.label('region'),
+                      Category.slug.label('category'), News.image_url, News.created_at, News.updated_at)
+              .outerjoin(Admin, Admin.id == News.admin_id)
+              .outerjoin(Region, Region.id == News.region_id)
+              .outerjoin(Category, Category.id == News.category_id)
+              .order_by(News.created_at, News.id)
+              .limit(chunk_size))
+    if region_id:
+        stmt = stmt.where(News.region_id == region_id)
+    if category_id:
+        stmt = stmt.where(News.category_id == category_id)
+    if date_from:
+        stmt = stmt.where(News.created_at >= date_from)
+    if date_to:
+        stmt = stmt.where(News.created_at < date_to + timedelta(days=1))
+
+    position = None
+    while True:
+        page = stmt if position is None else stmt.where(tuple_(News.created_at, News.id) > tuple_(*position))
+        rows = db.session.execute(page).all()
+        db.session.close()
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        position = rows[-1].created_at, rows[-1].id
+
+
+def export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def csv_export(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows([export_value(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_export(chunks):
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, map(export_value, row))), ensure_ascii=False) + '\n'
+                      for row in rows)
+
+
+def gzip_stream(pieces):
+    compressor = zlib.compressobj(wbits=31)  # 16 + 15: gzip header and trailer
+    for piece in pieces:
+        data = compressor.compress(piece.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_news(fmt, compress=False, **filters):
+    """The export file as a stream of bytes, one chunk of rows at a time"""
+    pieces = (csv_export if fmt == 'csv' else jsonl_export)(export_chunks(**filters))
+    return gzip_stream(pieces) if compress else (piece.encode() for piece in pieces)
+
+
+@cli.command('export-news')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True, allow_dash=True))
+@click.option('--format', 'fmt', type=click.Choice(tuple(EXPORT_TYPES)), help='Default: from the file extension.')
+@click.option('--gzip', 'compress', is_flag=True, help='Compress; implied by a .gz path.')
+@click.option('--region-id', type=int)
+@click.option('--category-id', type=int)
+@click.option('--from', 'date_from', type=click.DateTime(['%Y-%m-%d']), help='First day (YYYY-MM-DD).')
+@click.option('--to', 'date_to', type=click.DateTime(['%Y-%m-%d']), help='Last day, inclusive.')
+def export_news_command(path, fmt, compress, **filters):
+    """Write news to CSV or JSONL (optionally gzip), PATH '-' for stdout."""
+    compress = compress or path.endswith('.gz')
+    fmt = fmt or file_format(path[:-3] if path.endswith('.gz') else path)
+    if fmt not in EXPORT_TYPES:
+        raise click.UsageError('Exports are CSV or JSONL; use --format or a .csv/.jsonl path')
+    started = time.perf_counter()
+    with click.open_file(path, 'wb') as out:
+        for data in export_news(fmt, compress, **filters):
+            out.write(data)
+    click.echo('Exported to %s in %.2f s' % (path, time.perf_counter() - started), err=True)
 
 
 # --------------------
-# AUTH DECORATORS
+# IMAGES
 # --------------------
-from functools import wraps
+# Originals are stored once under their SHA-256 (media/originals/ab/<hash>.jpg);
+# thumbnails at each width in WebP and JPEG (media/thumbs/ab/<hash>-400.webp).
+# Names never change for a given content, so they are cached as immutable.
+MEDIA_PREFIX = '/media/'  # image_url of stored originals, see media()
+IMAGE_WIDTHS = (400, 800, 1200)  # cards, article, article on 2x screens
+IMAGE_MAX_AGE = 365 * 24 * 3600
+IMAGE_MAX_REDIRECTS = 3
+IMAGE_MAGIC = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
 
-def login_required_superadmin(f):
-    @wraps(f)
-    def wrapper(*args, **kwargs):
-        if 'superadmin_id' not in session:
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return wrapper
 
+class ImageWorkers:
+    """Thread pool that ingests article images off the request path.
+
+    IMAGE_WORKERS threads per process, started on first use (gunicorn forks
+    workers after the app is created). Each job runs in its own app context
+    and commits its own transaction. IMAGE_WORKERS=0 runs jobs inline.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.workers = app.config['IMAGE_WORKERS']
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.done = 0
+        self.errors = 0
+
+    def submit(self, job, *args):
+        self.submitted += 1
+        if self.workers <= 0:
+            self._run(job, args)
+        else:
+            self._pool().submit(self._run, job, args)
+
+    def _pool(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='images')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, job, args):
+        try:
+            with self.app.app_context():
+                job(*args)
+            self.done += 1
+        except Exception:
+            self.errors += 1
+            self.app.logger.exception('image job %s%r failed', job.__name__, args)
+
+    def stats(self):
+        return dict(pending=self.submitted - self.done - self.errors, done=self.done, errors=self.errors,
+                    workers=self.workers, thumbnails=Image is not None)
+
+
+def image_workers():
+    return current_app.extensions['image_workers']
+
+
+def image_type(data):
+    """File extension of JPEG, PNG, GIF or WebP bytes, None for anything else"""
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return next((ext for magic, ext in IMAGE_MAGIC if data.startswith(magic)), None)
+
+
+def media_path(name):
+    return os.path.join(current_app.config['MEDIA_DIR'], name)
+
+
+def write_media(name, save):
+    """Create media file name via save(path) on a temp file, renamed into place"""
+    path = media_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=os.path.splitext(name)[1])
+    os.close(fd)
+    try:
+        save(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def store_original(data):
+    """Keep image bytes once under their SHA-256; returns (hash, media name)"""
+    ext = image_type(data)
+    if ext is None:
+        raise ValueError('not a JPEG, PNG, GIF or WebP image')
+    digest = hashlib.sha256(data).hexdigest()
+    name = 'originals/%s/%s.%s' % (digest[:2], digest, ext)
+    if not os.path.exists(media_path(name)):
+        def save(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+        write_media(name, save)
+    return digest, name
+
+
+def thumbnail_name(digest, width, fmt):
+    return 'thumbs/%s/%s-%s.%s' % (digest[:2], digest, width, fmt)
+
+
+def make_thumbnails(digest, name):
+    """WebP and JPEG copies of an original at each IMAGE_WIDTHS below its width; returns the widths"""
+    with Image.open(media_path(name)) as original:
+        image = ImageOps.exif_transpose(original)
+        widths = [width for width in IMAGE_WIDTHS if width < image.width] or [image.width]
+        for width in widths:
+            resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            webp = resized if resized.mode in ('RGB', 'RGBA') else resized.convert('RGBA')
+            write_media(thumbnail_name(digest, width, 'webp'),
+                        lambda path: webp.save(path, 'WEBP', quality=80, method=4))
+            jpeg = resized.convert('RGB')
+            write_media(thumbnail_name(digest, width, 'jpg'),
+                        lambda path: jpeg.save(path, 'JPEG', quality=82, optimize=True, progressive=True))
+    return widths
 
-def login_required_admin(f):
-    @wraps(f)
-    def wrapper(*args, **kwargs):
-        if 'admin_id' not in session:
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return wrapper
+
+def thumbnails_job(digest, name):
+    """Make the thumbnails of a stored original and show them on every article using it"""
+    widths = ' '.join(map(str, make_thumbnails(digest, name)))
+    rows = db.session.execute(
+        db.update(News).where(News.image_hash == digest)
+          .values(image_widths=widths, updated_at=datetime.utcnow())  # moves the card/article cache keys
+          .returning(News.created_at)).all()
+    news_changed(*{month_key(created_at) for created_at, in rows})
+    db.session.commit()
+
+
+def public_address(host, port):
+    """An address of host to connect to, once every address it resolves to is checked to be public"""
+    addresses = [info[4][0].split('%')[0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)]
+    if not addresses or not all(ipaddress.ip_address(address).is_global for address in addresses):
+        raise ValueError('%s is not a public address' % host)
+    return addresses[0]
+
+
+class PinnedHTTPConnection(http.client.HTTPConnection):
+    """HTTP to an address checked by public_address(), so DNS is not asked twice"""
+
+    def __init__(self, address, host, port, timeout):
+        super().__init__(host, port, timeout=timeout)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+
+class PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS to a checked address; SNI and the certificate still use the host name"""
+
+    def __init__(self, address, host, port, timeout):
+        super().__init__(host, port, timeout=timeout, context=ssl.create_default_context())
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+def download_image(url):
+    """Image bytes from a public http(s) URL, at most IMAGE_MAX_BYTES.
+
+    Every hop, redirects included, is resolved and checked before it is
+    connected to, and the connection goes to the checked address itself:
+    neither a redirect nor a DNS answer that changes in between can point
+    the worker at an internal host.
+    """
+    max_bytes = current_app.config['IMAGE_MAX_BYTES']
+    for _hop in range(IMAGE_MAX_REDIRECTS + 1):
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            raise ValueError('not an http(s) URL: %r' % url)
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        connection_class = PinnedHTTPSConnection if parsed.scheme == 'https' else PinnedHTTPConnection
+        connection = connection_class(public_address(parsed.hostname, port), parsed.hostname, port,
+                                      current_app.config['IMAGE_FETCH_TIMEOUT'])
+        try:
+            connection.request('GET', urllib.parse.urlunsplit(('', '', parsed.path or '/', parsed.query, '')),
+                               headers={'User-Agent': 'EcoNews image fetcher'})
+            response = connection.getresponse()
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                url = urllib.parse.urljoin(url, response.getheader('Location'))
+                continue
+            if response.status != 200:
+                raise ValueError('%s answered HTTP %d' % (parsed.hostname, response.status))
+            data = response.read(max_bytes + 1)
+        finally:
+            connection.close()
+        if len(data) > max_bytes:
+            raise ValueError('image is larger than %d bytes' % max_bytes)
+        return data
+    raise ValueError('more than %d redirects' % IMAGE_MAX_REDIRECTS)
+
+
+def fetch_image_job(news_id, url):
+    """Copy a remote image_url into media, then make its thumbnails"""
+    digest, name = store_original(download_image(url))
+    news = db.session.get(News, news_id)
+    if news is None or news.image_url != url:
+        return  # deleted or given another image meanwhile
+    news.image_hash, news.image_url, news.image_widths = digest, MEDIA_PREFIX + name, None
+    news_changed(month_key(news.created_at))
+    db.session.commit()
+    if Image is not None:
+        thumbnails_job(digest, name)
+
+
+def attach_upload(news, upload):
+    """Store an uploaded image now; its thumbnails follow from queue_image()"""
+    data = upload.read(current_app.config['IMAGE_MAX_BYTES'] + 1)
+    if len(data) > current_app.config['IMAGE_MAX_BYTES']:
+        raise ValueError('image is larger than %d bytes' % current_app.config['IMAGE_MAX_BYTES'])
+    digest, name = store_original(data)
+    news.image_hash, news.image_url, news.image_widths = digest, MEDIA_PREFIX + name, None
+
+
+def queue_image(news):
+    """After commit: thumbnails of a new upload, or a download of a new remote image_url"""
+    if news.image_hash and not news.image_widths:
+        if Image is not None:
+            image_workers().submit(thumbnails_job, news.image_hash, news.image_url[len(MEDIA_PREFIX):])
+    elif news.image_url and not news.image_hash and news.image_url.startswith(('http://', 'https://')):
+        image_workers().submit(fetch_image_job, news.id, news.image_url)
+
+
+def thumbnail_url(news, width, fmt='jpg'):
+    return url_for('media', filename=thumbnail_name(news.image_hash, width, fmt))
+
+
+def image_srcset(news, fmt):
+    """srcset of the article's thumbnails in fmt ('webp' or 'jpg')"""
+    return ', '.join('%s %sw' % (thumbnail_url(news, width, fmt), width) for width in news.image_widths.split())
+
+
+@cli.command('ingest-images')
+def ingest_images_command():
+    """Copy remote image URLs into media and make missing thumbnails, inline."""
+    fetched = thumbnailed = failed = 0
+    for news_id, image_url, image_hash in db.session.execute(
+            db.select(News.id, News.image_url, News.image_hash)
+              .where(News.image_url.isnot(None), (News.image_widths.is_(None)) | (News.image_widths == ''))).all():
+        try:
+            if image_hash:
+                if Image is None:
+                    continue
+                thumbnails_job(image_hash, image_url[len(MEDIA_PREFIX):])
+                thumbnailed += 1
+            elif image_url.startswith(('http://', 'https://')):
+                fetch_image_job(news_id, image_url)
+                fetched += 1
+        except Exception as e:
+            db.session.rollback()
+            failed += 1
+            click.echo('  news %d: %s' % (news_id, e))
+    click.echo('Fetched %d, thumbnailed %d, failed %d%s' % (
+        fetched, thumbnailed, failed, '' if Image is not None else ' (Pillow not installed: no thumbnails)'))
 
 
 # --------------------
 # CONTEXT
 # --------------------
-@app.context_processor
 def inject_globals():
-    return dict(regions=Region.query.all(), categories=Category.query.all(), random=random, _=_)
+    regions, categories = cached_taxonomy()
+    return dict(regions=regions, categories=categories, random=random, _=_,
+                taxonomy_version=cache_versions().get('taxonomy', 0),
+                canonical_url=canonical_url() if has_request_context() else url_for('index'))
 
 
 # --------------------
 # ROUTES
 # -------------------- 
-@app.route('/')
+# (rule, view, options) in declaration order; create_app() adds them to
+# each app with the view's own name as the endpoint, like app.route
+URL_RULES = []
+
+
+def route(rule, **options):
+    def decorator(f):
+        URL_RULES.append((rule, f, options))
+        return f
+    return decorator
+
+
+@route('/')
+@conditional_page
+@cached_page
 def index():
     get_locale()  # Set language for this request
     
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')  # ?cursor= (empty) starts cursor mode
     search_query = request.args.get('q', '')
     region_id = request.args.get('region_id', type=int)
     category_id = request.args.get('category_id', type=int)
+    sort = request.args.get('sort') if request.args.get('sort') in FEED_SORTS else None
+    if sort:
+        cursor = None  # trending is ranked, not a (created_at, id) keyset
     
-    # Build query
-    query = News.query
-    
-    if search_query:
-        query = query.filter(News.title.contains(search_query) | News.content.contains(search_query))
-    
-    if region_id:
-        query = query.filter(News.region_id == region_id)
-    
-    if category_id:
-        query = query.filter(News.category_id == category_id)
-    
-    query = query.order_by(News.created_at.desc())
+    query = feed_query(search_query, region_id, category_id, ranked=cursor is None and sort is None)
+    total = cached_count(query, (search_query, region_id, category_id))
     
-    pagination = query.paginate(page=page, per_page=10, error_out=False)
+    # Cards show category, region and author: load them with the page
+    if cursor is not None:
+        pagination = KeysetPage(query.options(*NEWS_CARD_LOADS), cursor, NEWS_PER_PAGE, total)
+    else:
+        pagination = feed_page_query(query, sort).paginate(page=page, per_page=NEWS_PER_PAGE,
+                                                           error_out=False, count=False)
+        pagination.total = total
     news_list = pagination.items
     
     return render_template('index.html', 
@@ -268,10 +2669,132 @@ def index():
                          search_query=search_query,
                          current_region_id=region_id,
                          current_category_id=category_id,
+                         current_sort=sort,
                          _=_)
 
 
-@app.route('/admin/login', methods=['GET', 'POST'])
+@route('/news/<int:news_id>')
+@route('/news/<int:news_id>-<slug>')
+def news_detail(news_id, slug=None):
+    news = (News.query.options(joinedload(News.category), joinedload(News.region), joinedload(News.admin))
+                      .filter_by(id=news_id).first_or_404())
+    if slug != news.slug:
+        return redirect(url_for('news_detail', news_id=news.id, slug=news.slug), 301)
+    if request.method == 'GET':
+        record_view(news.id)
+
+    key = article_cache_key(news, get_locale())
+    article_html = article_cache().get(key)
+    if article_html is None:
+        article_html = render_template('_news_article.html', news=news)
+        article_cache().set(key, article_html, size=len(article_html.encode()))
+    return render_template('news_detail.html', news=news, article_html=Markup(article_html))
+
+
+@route('/news/<int:news_id>/like', methods=['POST', 'DELETE'])
+def like_news(news_id):
+    """Like (POST) or unlike (DELETE) once per browser; stored by the write-behind flusher"""
+    news = News.query.options(load_only(News.like_count)).filter_by(id=news_id).first_or_404()
+    client = client_id()
+    liked = request.method == 'POST'
+    stored = db.session.query(NewsLike.query.filter_by(news_id=news_id, client_id=client).exists()).scalar()
+    # like_count trails other browsers by up to one flush interval
+    likes = news.like_count + (liked and not stored) - (not liked and stored)
+    write_behind().add('likes', (news_id, client), liked)
+    return jsonify(news_id=news_id, liked=liked, likes=likes)
+
+
+LIKE_COUNTS_MAX_IDS = 100
+
+
+@route('/api/likes')
+@conditional(('likes',))
+def like_counts():
+    """{news_id: like_count} for ?ids=1,2,3; cached pages fill in counts from here"""
+    try:
+        ids = [int(news_id) for news_id in request.args.get('ids', '').split(',') if news_id]
+    except ValueError:
+        abort(400)
+    rows = db.session.execute(db.select(News.id, News.like_count)
+                                .where(News.id.in_(ids[:LIKE_COUNTS_MAX_IDS])))
+    return jsonify({str(news_id): likes for news_id, likes in rows})
+
+
+@route('/api/stats')
+def api_stats():
+    """Site, region and category counters; reads scope_stat only (cached per version)"""
+    response = jsonify(stats_payload())
+    response.cache_control.public = True
+    response.cache_control.max_age = 30
+    return response
+
+
+@route(MEDIA_PREFIX + '<path:filename>')
+def media(filename):
+    return send_from_directory(current_app.config['MEDIA_DIR'], filename, max_age=IMAGE_MAX_AGE)
+
+
+@route('/feed.<any(xml, json):fmt>')
+@conditional(FEED_VERSIONS, max_age=FEED_MAX_AGE)
+def feed(fmt):
+    return feed_response(fmt, _("Yangiliklar sayti"), url_for('index', _external=True))
+
+
+@route('/region/<slug>/feed.<any(xml, json):fmt>')
+@conditional(FEED_VERSIONS, max_age=FEED_MAX_AGE)
+def region_feed(slug, fmt):
+    region = next((r for r in cached_taxonomy()[0] if r.slug == slug), None) or abort(404)
+    return feed_response(fmt, '%s — %s' % (_("Yangiliklar sayti"), region.name),
+                         url_for('index', region_id=region.id, _external=True), region_id=region.id)
+
+
+@route('/category/<slug>/feed.<any(xml, json):fmt>')
+@conditional(FEED_VERSIONS, max_age=FEED_MAX_AGE)
+def category_feed(slug, fmt):
+    category = next((c for c in cached_taxonomy()[1] if c.slug == slug), None) or abort(404)
+    return feed_response(fmt, '%s — %s' % (_("Yangiliklar sayti"), category.name),
+                         url_for('index', category_id=category.id, _external=True), category_id=category.id)
+
+
+@route('/sitemap.xml')
+@conditional(('news',), max_age=SITEMAP_MAX_AGE)
+def sitemap_index():
+    entries = ['<sitemap><loc>%s</loc><lastmod>%s</lastmod></sitemap>\n' % (
+                   html.escape(url_for('sitemap_month', year=key // 100, month=key % 100, _external=True)),
+                   sitemap_lastmod(lastmod))
+               for key, lastmod in sitemap_months()]
+    return Response(SITEMAP_HEAD % 'sitemapindex' + ''.join(entries) + '</sitemapindex>\n',
+                    content_type=SITEMAP_TYPE)
+
+
+@route('/sitemap-<int(fixed_digits=4):year>-<int(fixed_digits=2):month>.xml')
+@conditional(lambda year, month: ('sitemap:%d%02d' % (year, month),), max_age=SITEMAP_MAX_AGE)
+def sitemap_month(year, month):
+    key = year * 100 + month
+    stat = db.session.get(ScopeStat, ('month', key)) if 1 <= month <= 12 else None
+    if stat is None or not stat.news_count:
+        abort(404)
+
+    cache_key = '%s|%d|%d' % (request.host_url, key, cache_versions().get('sitemap:%d' % key, 0))
+    cache = sitemap_cache()
+    body = cache.get(cache_key)
+    if body is not None:
+        response = Response(body, content_type=SITEMAP_TYPE)
+        response.headers['X-Cache'] = 'HIT'
+        return response
+    response = Response(stream_with_context(cached_stream(cache, cache_key, sitemap_shard(key))),
+                        content_type=SITEMAP_TYPE)
+    response.headers['X-Cache'] = 'MISS'
+    return response
+
+
+@route('/robots.txt')
+def robots_txt():
+    return Response('User-agent: *\nDisallow: /admin/\nDisallow: /superadmin/\nSitemap: %s\n'
+                    % url_for('sitemap_index', _external=True), content_type='text/plain; charset=utf-8')
+
+
+@route('/admin/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
@@ -293,17 +2816,92 @@ def login():
     return render_template('login.html')
 
 
-@app.route('/superadmin/dashboard')
+@route('/superadmin/dashboard')
 @login_required_superadmin
 def superadmin_dashboard():
+    # Per-region counts from scope_stat, no COUNT over news or admins
+    stats = scope_stats()
+    empty = ScopeStat(news_count=0, admin_count=0)
+    region_rows = []
+    for region in Region.query.order_by(Region.id):
+        stat = stats.get(('region', region.id), empty)
+        region_rows.append((region, stat.admin_count, stat.news_count))
+
+    # "Barcha Yangiliklar" table: paginated and sorted in SQL
+    news_filters = dict(
+        news_region_id=request.args.get('news_region_id', type=int),
+        news_q=request.args.get('news_q', ''),
+        news_sort=request.args.get('news_sort', 'new'),
+    )
+    if news_filters['news_sort'] not in NEWS_TABLE_SORTS:
+        news_filters['news_sort'] = 'new'
+
+    news_pagination = (news_table_query(news_filters['news_region_id'], news_filters['news_q'],
+                                        news_filters['news_sort'])
+                       .paginate(page=request.args.get('news_page', 1, type=int),
+                                 per_page=NEWS_TABLE_PER_PAGE, error_out=False))
+
     return render_template(
         'superadmin_dashboard.html',
-        regions=Region.query.all(),
-        admins=Admin.query.all()
+        regions=[row[0] for row in region_rows],
+        region_rows=region_rows,
+        total_news=stats.get(('all', 0), empty).news_count,
+        total_admins=stats.get(('all', 0), empty).admin_count,
+        admins=Admin.query.options(joinedload(Admin.region)).all(),
+        news_pagination=news_pagination,
+        news_filters=news_filters,
     )
 
 
-@app.route('/admin/region/add', methods=['GET', 'POST'])
+@route('/superadmin/cache-stats')
+@login_required_superadmin
+def superadmin_cache_stats():
+    cache = response_cache()
+    return jsonify(response_cache=cache.stats() if cache else None,
+                   article_cache=article_cache().stats(),
+                   sitemap_cache=sitemap_cache().stats(),
+                   fragment_cache=fragment_cache_stats(),
+                   write_behind=write_behind().stats(),
+                   image_workers=image_workers().stats())
+
+
+@route('/superadmin/news/import', methods=['GET', 'POST'])
+@login_required_superadmin
+def superadmin_import_news():
+    report, error = None, None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        fmt = request.form.get('format') or file_format(upload.filename if upload else None)
+        if not upload or not upload.filename:
+            error = 'Fayl tanlanmagan'
+        elif fmt not in IMPORT_FORMATS:
+            error = 'Noma\'lum format: %s' % fmt
+        else:
+            report = import_news(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''), fmt)
+    return render_template('import_news.html', report=report, error=error, shown_errors=IMPORT_SHOWN_ERRORS)
+
+
+@route('/superadmin/news/export')
+@login_required_superadmin
+def superadmin_export_news():
+    fmt = request.args.get('format')
+    if fmt not in EXPORT_TYPES:
+        regions, categories = cached_taxonomy()
+        return render_template('export_news.html', regions=regions, categories=categories)
+
+    compress = bool(request.args.get('gzip'))
+    try:
+        filters = export_filters(request.args)
+    except ValueError as e:
+        abort(400, description=str(e))
+    response = Response(stream_with_context(export_news(fmt, compress, **filters)),
+                        content_type='application/gzip' if compress else EXPORT_TYPES[fmt])
+    response.headers['Content-Disposition'] = 'attachment; filename=news-%s.%s%s' % (
+        datetime.utcnow().strftime('%Y%m%d'), fmt, '.gz' if compress else '')
+    return response
+
+
+@route('/admin/region/add', methods=['GET', 'POST'])
 @login_required_superadmin
 def add_region():
     if request.method == 'POST':
@@ -312,24 +2910,28 @@ def add_region():
             slug=request.form['slug']
         )
         db.session.add(region)
+        db.session.flush()
+        adjust_stats([('region', region.id)])
+        bump_cache_version('taxonomy')
         db.session.commit()
         return redirect(url_for('superadmin_dashboard'))
     return render_template('add_region.html')
 
 
-@app.route('/admin/region/edit/<int:region_id>', methods=['GET', 'POST'])
+@route('/admin/region/edit/<int:region_id>', methods=['GET', 'POST'])
 @login_required_superadmin
 def edit_region(region_id):
     region = Region.query.get_or_404(region_id)
     if request.method == 'POST':
         region.name = request.form['name']
         region.slug = request.form['slug']
+        bump_cache_version('taxonomy')
         db.session.commit()
         return redirect(url_for('superadmin_dashboard'))
     return render_template('edit_region.html', region=region)
 
 
-@app.route('/admin/admin/add', methods=['GET', 'POST'])
+@route('/admin/admin/add', methods=['GET', 'POST'])
 @login_required_superadmin
 def add_admin():
     regions = Region.query.all()
@@ -340,21 +2942,27 @@ def add_admin():
         )
         admin.set_password(request.form['password'])
         db.session.add(admin)
+        adjust_stats(stat_scopes(admin.region_id), admins=1)
         db.session.commit()
         return redirect(url_for('superadmin_dashboard'))
     return render_template('add_admin.html', regions=regions)
 
 
-@app.route('/admin/admin/edit/<int:admin_id>', methods=['GET', 'POST'])
+@route('/admin/admin/edit/<int:admin_id>', methods=['GET', 'POST'])
 @login_required_superadmin
 def edit_admin(admin_id):
     admin = Admin.query.get_or_404(admin_id)
     regions = Region.query.all()
     if request.method == 'POST':
+        old_region_id = admin.region_id
         admin.username = request.form['username']
-        admin.region_id = request.form['region_id']
+        admin.region_id = int(request.form['region_id'])
+        if admin.region_id != old_region_id:
+            adjust_stats([('region', old_region_id)], admins=-1)
+            adjust_stats([('region', admin.region_id)], admins=1)
         if request.form.get('password'):
             admin.set_password(request.form['password'])
+        news_changed()  # cards show the author's name
         db.session.commit()
         return redirect(url_for('superadmin_dashboard'))
     return render_template('edit_admin.html', admin=admin, regions=regions)
@@ -362,16 +2970,21 @@ def edit_admin(admin_id):
 
 
 
-@app.route('/admin/dashboard')
+@route('/admin/dashboard')
 @login_required_admin
 def admin_dashboard():
     admin = Admin.query.get(session['admin_id'])
     region = Region.query.get(admin.region_id)
-    news_list = News.query.filter_by(admin_id=admin.id).order_by(News.created_at.desc()).all()
-    return render_template('admin_dashboard.html', admin=admin, region=region, news_list=news_list)
+    pagination = admin_news_query(admin.id).paginate(page=request.args.get('page', 1, type=int),
+                                                     per_page=ADMIN_NEWS_PER_PAGE, error_out=False)
+    region_stat = db.session.get(ScopeStat, ('region', region.id))
+    region_news_count = region_stat.news_count if region_stat else 0
+    return render_template('admin_dashboard.html', admin=admin, region=region,
+                           news_list=pagination.items, pagination=pagination,
+                           region_news_count=region_news_count)
 
 
-@app.route('/admin/news/add', methods=['GET', 'POST'])
+@route('/admin/news/add', methods=['GET', 'POST'])
 @login_required_admin
 def add_news():
     admin = Admin.query.get(session['admin_id'])
@@ -379,18 +2992,27 @@ def add_news():
     if request.method == 'POST':
         news = News(
             title=request.form['title'],
-            content=request.form['content'],
-            image_url=request.form.get('image_url'),
+            image_url=request.form.get('image_url') or None,
             admin_id=admin.id,
             region_id=admin.region_id,
-            category_id=request.form.get('category_id')
+            category_id=request.form.get('category_id', type=int)
         )
+        news.set_content(request.form['content'])
+        if request.files.get('image_file'):
+            try:
+                attach_upload(news, request.files['image_file'])
+            except ValueError:
+                flash(_('Rasm JPEG, PNG, GIF yoki WebP formatida va 10 MB dan kichik bo‘lishi kerak'))
+                return render_template('add_news.html', categories=Category.query.all(), region=region)
         db.session.add(news)
+        news_added(news)
+        news_changed(month_key(news.created_at))
         db.session.commit()
+        queue_image(news)
         return redirect(url_for('admin_dashboard'))
     return render_template('add_news.html', categories=Category.query.all(), region=region)
 
-@app.route('/admin/news/edit/<int:news_id>', methods=['GET', 'POST'])
+@route('/admin/news/edit/<int:news_id>', methods=['GET', 'POST'])
 @login_required_admin
 def edit_news(news_id):
     admin = Admin.query.get(session['admin_id'])
@@ -403,15 +3025,33 @@ def edit_news(news_id):
         
     if request.method == 'POST':
         news.title = request.form['title']
-        news.content = request.form['content']
-        news.image_url = request.form.get('image_url')
-        news.category_id = request.form.get('category_id')
+        news.set_content(request.form['content'])
+        image_url = request.form.get('image_url') or None
+        if request.files.get('image_file'):
+            try:
+                attach_upload(news, request.files['image_file'])
+            except ValueError:
+                flash(_('Rasm JPEG, PNG, GIF yoki WebP formatida va 10 MB dan kichik bo‘lishi kerak'))
+                return render_template('edit_news.html', news=news, categories=Category.query.all(), region=region)
+        elif image_url != news.image_url:
+            news.image_url, news.image_hash, news.image_widths = image_url, None, None
+        old_category_id = news.category_id
+        news.category_id = request.form.get('category_id', type=int)
+        if news.category_id != old_category_id:
+            if old_category_id:
+                adjust_stats([('category', old_category_id)], news=-1)
+                refresh_latest([('category', old_category_id)])
+            if news.category_id:
+                adjust_stats([('category', news.category_id)], news=1, latest=news.created_at)
+        forget_article(news)
+        news_changed(month_key(news.created_at))
         db.session.commit()
+        queue_image(news)
         return redirect(url_for('admin_dashboard'))
         
     return render_template('edit_news.html', news=news, categories=Category.query.all(), region=region)
 
-@app.route('/admin/news/delete/<int:news_id>', methods=['POST'])
+@route('/admin/news/delete/<int:news_id>', methods=['POST'])
 @login_required_admin
 def delete_news(news_id):
     admin = Admin.query.get(session['admin_id'])
@@ -421,45 +3061,123 @@ def delete_news(news_id):
         flash(_('Siz faqat o‘zingizning yangiliklaringizni o‘chirishingiz mumkin'))
         return redirect(url_for('admin_dashboard'))
         
+    delete_news_counters([news.id])
     db.session.delete(news)
+    news_removed(news)
+    forget_article(news)
+    news_changed(month_key(news.created_at))
     db.session.commit()
     return redirect(url_for('admin_dashboard'))
 
-@app.route('/superadmin/news/delete/<int:news_id>', methods=['POST'])
+@route('/superadmin/news/delete/<int:news_id>', methods=['POST'])
 @login_required_superadmin
 def superadmin_delete_news(news_id):
     news = News.query.get_or_404(news_id)
+    delete_news_counters([news.id])
     db.session.delete(news)
+    news_removed(news)
+    forget_article(news)
+    news_changed(month_key(news.created_at))
     db.session.commit()
     return redirect(url_for('superadmin_dashboard'))
 
-@app.route('/superadmin/region/delete/<int:region_id>', methods=['POST'])
+@route('/superadmin/region/delete/<int:region_id>', methods=['POST'])
 @login_required_superadmin
 def superadmin_delete_region(region_id):
     region = Region.query.get_or_404(region_id)
     # Delete all news and admins associated with this region
+    months = db.session.scalars(db.select(NEWS_MONTH).filter_by(region_id=region_id).distinct()).all()
+    delete_news_counters(db.select(News.id).filter_by(region_id=region_id))
     News.query.filter_by(region_id=region_id).delete()
     Admin.query.filter_by(region_id=region_id).delete()
     db.session.delete(region)
+    bump_cache_version('taxonomy')
+    news_changed(*months)
     db.session.commit()
+    reconcile_stats()  # rare: recount rather than adjust every category
     return redirect(url_for('superadmin_dashboard'))
 
-@app.route('/superadmin/admin/delete/<int:admin_id>', methods=['POST'])
+@route('/superadmin/admin/delete/<int:admin_id>', methods=['POST'])
 @login_required_superadmin
 def superadmin_delete_admin(admin_id):
     admin = Admin.query.get_or_404(admin_id)
     # Optionally delete news by this admin
     # News.query.filter_by(admin_id=admin_id).delete()
     db.session.delete(admin)
+    adjust_stats(stat_scopes(admin.region_id), admins=-1)
+    news_changed()  # cards show the author's name
     db.session.commit()
     return redirect(url_for('superadmin_dashboard'))
 
 
-@app.route('/logout')
+@route('/logout')
 def logout():
     session.clear()
     return redirect(url_for('index'))
 
 
+# --------------------
+# APP FACTORY
+# --------------------
+def create_app(config=None):
+    """Build the app; nothing here opens a database connection"""
+    app = Flask(__name__)
+    app.config.from_mapping(default_config())
+    app.config.from_mapping(config or {})
+
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    db.init_app(app)
+    with app.app_context():
+        pragmas = sqlite_pragmas(app.config)
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite' and pragmas:
+                apply_sqlite_pragmas(engine, pragmas)
+    for command in cli.commands.values():
+        app.cli.add_command(command)
+
+    # In-process caches are per app: two apps may sit on different databases
+    # whose cache versions happen to match
+    app.extensions.update(taxonomy_cache={}, count_cache={}, stats_cache={}, fragment_stats={},
+                          article_cache=LRUCache(ARTICLE_CACHE_MAX_BYTES),
+                          fragment_cache=LRUCache(FRAGMENT_CACHE_MAX_BYTES, FRAGMENT_CACHE_MAX_ENTRIES),
+                          sitemap_cache=LRUCache(SITEMAP_CACHE_MAX_BYTES))
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    os.makedirs(app.config['JINJA_BYTECODE_CACHE_DIR'], exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR'])
+
+    app.extensions['write_behind'] = WriteBehind(app)
+    app.extensions['write_behind'].register('likes', flush_likes)
+    app.extensions['write_behind'].register('views', flush_views, combine=lambda old, new: old + new)
+    app.extensions['write_behind'].add_task(refresh_trending_if_due)
+    app.extensions['write_behind'].add_task(reconcile_stats_if_due)
+    app.before_request(app.extensions['write_behind'].start)
+
+    app.extensions['image_workers'] = ImageWorkers(app)
+    if Image is None:
+        app.logger.warning('Pillow is not installed: article images are stored and shown, but no '
+                           'WebP/JPEG thumbnails or srcset are made (pip install -r requirements.txt)')
+    app.jinja_env.globals.update(image_srcset=image_srcset, thumbnail_url=thumbnail_url)
+
+    app.context_processor(inject_globals)
+    app.after_request(pin_to_primary)
+    for rule, view, options in URL_RULES:
+        app.add_url_rule(rule, view_func=view, **options)
+
+    # Warm every template before this worker serves its first request
+    if app.config['PRECOMPILE_TEMPLATES']:
+        with app.app_context():
+            timings = precompile_templates()
+        app.logger.info('Precompiled %d templates in %.1f ms', len(timings), sum(ms for _name, ms in timings))
+
+    return app
+
+
+app = create_app()
+
+
 if __name__ == '__main__':
+    # Development server: create the schema and seed it on first run
+    with app.app_context():
+        init_db()
     app.run(debug=True, host='0.0.0.0', port=5000)
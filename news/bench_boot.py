@@ -0,0 +1,90 @@
+"""
+Worker boot time: how long `import app` takes in a fresh interpreter,
+which is what every gunicorn worker and verify_*.py script pays on start.
+
+Two scenarios, each on an existing database and on an empty one:
+  import-time init  the module body plus create_all() and seeding, which
+                    is what importing app.py did before `flask init-db`
+  factory           the module body alone (create_app(), no database work)
+The libraries app.py imports are loaded before the clock starts, so only
+the module body is timed; the full process time is printed for reference.
+"""
+
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+# Everything heavy app.py imports; PIL is optional
+PRELOAD = ('flask', 'flask_sqlalchemy', 'sqlalchemy.dialects.postgresql', 'sqlalchemy.dialects.sqlite',
+           'babel.messages.mofile', 'babel.messages.pofile', 'jinja2', 'werkzeug.security', 'PIL.Image')
+
+SNIPPET = '''
+import importlib, time
+for name in %(preload)r:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+start = time.perf_counter()
+import app
+if %(init)r:
+    with app.app.app_context():
+        app.init_db()
+print('\\n%%.3f' %% ((time.perf_counter() - start) * 1000))
+'''
+
+SCENARIOS = (('import-time init', True), ('factory', False))
+
+
+def boot_once(init, database_url):
+    code = SNIPPET % {'preload': PRELOAD, 'init': init}
+    env = dict(os.environ, DATABASE_URL=database_url)
+    output = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, env=env, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+    return float(output.split()[-1])
+
+
+def full_import_ms():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import app'], cwd=BASE_DIR, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_boot(runs=25):
+    directory = tempfile.mkdtemp(prefix='bench_boot_')
+    existing = 'sqlite:///' + os.path.join(directory, 'existing.db')
+    try:
+        boot_once(True, existing)  # creates the existing database, warms the OS file cache and __pycache__
+        print(f"module body only, median of {runs} runs (min / max):")
+        for database in ('existing database', 'empty database'):
+            for label, init in SCENARIOS:
+                timings = []
+                for run in range(runs):
+                    if database == 'existing database':
+                        url = existing
+                    else:
+                        url = 'sqlite:///' + os.path.join(directory, f'empty-{label}-{run}.db')
+                    timings.append(boot_once(init, url))
+                timings.sort()
+                print(f"  {database:18} {label:17} {statistics.median(timings):8.1f} ms"
+                      f"  ({timings[0]:.1f} / {timings[-1]:.1f})")
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        baseline = (time.perf_counter() - start) * 1000
+        full = statistics.median(full_import_ms() for _ in range(5))
+        print(f"python startup               {baseline:8.1f} ms")
+        print(f"full `import app` (process)  {full:8.1f} ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    bench_boot()
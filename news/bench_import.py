@@ -0,0 +1,75 @@
+"""
+Import throughput: N articles added the way the add_news form does it
+(one INSERT and one commit per article) against import_news() batches,
+each on a fresh database
+
+    python bench_import.py --rows 5000 --batch-size 500
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from app import create_app, db, init_db, News, Region, Admin, news_added, news_changed, month_key, import_news
+
+
+def fresh_app(directory, name):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, name)})
+    with app.app_context():
+        init_db()
+        region = Region(name='Bench', slug='bench')
+        db.session.add(region)
+        db.session.flush()
+        admin = Admin(username='bench', region_id=region.id)
+        admin.set_password('bench')
+        db.session.add(admin)
+        db.session.commit()
+    return app
+
+
+def per_row(app, rows):
+    with app.app_context():
+        admin = Admin.query.filter_by(username='bench').one()
+        started = time.perf_counter()
+        for i in range(rows):
+            news = News(title=f'Bench news {i}', admin_id=admin.id, region_id=admin.region_id)
+            news.set_content(f'Bench content {i} ' * 40)
+            db.session.add(news)
+            news_added(news)
+            news_changed(month_key(news.created_at))
+            db.session.commit()
+        return time.perf_counter() - started
+
+
+def batched(app, rows, batch_size):
+    lines = ''.join(json.dumps({'title': f'Bench news {i}', 'content': f'Bench content {i} ' * 40, 'admin': 'bench'})
+                    + '\n' for i in range(rows))
+    with app.app_context():
+        report = import_news(io.StringIO(lines), 'jsonl', batch_size)
+        assert report.inserted == rows, report.errors[:5]
+        return report.seconds
+
+
+def bench_import():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='bench_import_')
+    try:
+        one = per_row(fresh_app(directory, 'per_row.db'), args.rows)
+        bulk = batched(fresh_app(directory, 'batched.db'), args.rows, args.batch_size)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{args.rows} articles")
+    print(f"one commit per article   {one:8.2f} s {args.rows / one:9.0f} rows/s")
+    print(f"import_news batch {args.batch_size:<6} {bulk:8.2f} s {args.rows / bulk:9.0f} rows/s")
+
+
+if __name__ == '__main__':
+    bench_import()
@@ -0,0 +1,119 @@
+"""
+Concurrency benchmark: N reader threads run the feed queries while M writer
+threads publish news, once per SQLITE_PROFILE, each on a fresh database
+
+    python bench_sqlite.py --readers 8 --writers 2 --seconds 5
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import create_app, db, init_db, News, Region, Admin, SQLITE_PROFILES, NEWS_CARD_LOADS
+
+
+def seed(app, rows=2000):
+    with app.app_context():
+        init_db()
+        region = Region(name='Bench', slug='bench')
+        db.session.add(region)
+        db.session.flush()
+        admin = Admin(username='bench', region_id=region.id)
+        admin.set_password('bench')
+        db.session.add(admin)
+        db.session.flush()
+        base_time = datetime.utcnow() - timedelta(days=30)
+        for i in range(rows):
+            news = News(title=f'Bench news {i}', admin_id=admin.id, region_id=region.id,
+                        created_at=base_time + timedelta(minutes=i))
+            news.set_content(f'Bench content {i} ' * 40)
+            db.session.add(news)
+        db.session.commit()
+        return admin.id, region.id
+
+
+def reader(app, stop, latencies, errors):
+    with app.app_context():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                News.query.options(*NEWS_CARD_LOADS).order_by(News.created_at.desc(), News.id.desc()).limit(10).all()
+                News.query.count()
+            except OperationalError:
+                errors.append(1)
+            finally:
+                db.session.rollback()
+            latencies.append(time.perf_counter() - started)
+
+
+def writer(app, stop, latencies, errors, admin_id, region_id):
+    with app.app_context():
+        n = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                news = News(title=f'Written {threading.get_ident()} {n}', admin_id=admin_id, region_id=region_id)
+                news.set_content('Written content ' * 40)
+                db.session.add(news)
+                db.session.commit()
+            except OperationalError:
+                db.session.rollback()
+                errors.append(1)
+            latencies.append(time.perf_counter() - started)
+            n += 1
+
+
+def run_profile(profile, readers, writers, seconds):
+    directory = tempfile.mkdtemp(prefix='bench_sqlite_')
+    try:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'bench.db'),
+            'SQLITE_PROFILE': profile,
+            'DB_POOL_SIZE': readers + writers,
+        })
+        admin_id, region_id = seed(app)
+        with app.app_context():
+            journal = db.session.execute(text('PRAGMA journal_mode')).scalar()
+
+        stop = threading.Event()
+        read_latencies, write_latencies, errors = [], [], []
+        threads = [threading.Thread(target=reader, args=(app, stop, read_latencies, errors)) for _ in range(readers)]
+        threads += [threading.Thread(target=writer, args=(app, stop, write_latencies, errors, admin_id, region_id))
+                    for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        def p95(values):
+            return statistics.quantiles(values, n=20)[-1] * 1000 if len(values) > 1 else float('nan')
+
+        print(f"{profile:<11} {journal:<8} {len(read_latencies) / seconds:9.0f} {p95(read_latencies):9.1f}"
+              f" {len(write_latencies) / seconds:9.0f} {p95(write_latencies):9.1f} {len(errors):7d}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_sqlite():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers + {args.writers} writers, {args.seconds:g} s per profile")
+    print(f"{'profile':<11} {'journal':<8} {'reads/s':>9} {'p95 ms':>9} {'writes/s':>9} {'p95 ms':>9} {'errors':>7}")
+    for profile in SQLITE_PROFILES:
+        run_profile(profile, args.readers, args.writers, args.seconds)
+
+
+if __name__ == '__main__':
+    bench_sqlite()
@@ -0,0 +1,42 @@
+"""
+Microbenchmark: precompiled translation catalog vs the old per-call dict _()
+"""
+
+import timeit
+from flask import session
+from app import app, CATALOGS, _
+
+
+def make_legacy_translate():
+    """Rebuild the old _(): a nested dict literal evaluated on every call"""
+    body = repr({lang: dict(catalog) for lang, catalog in CATALOGS.items()})
+    source = (
+        "def legacy_translate(text):\n"
+        "    lang = session.get('language', 'uz')\n"
+        "    translations = %s\n"
+        "    return translations.get(lang, {}).get(text, text)\n" % body
+    )
+    namespace = {'session': session}
+    exec(source, namespace)
+    return namespace['legacy_translate']
+
+
+def bench_translations(number=100000):
+    legacy_translate = make_legacy_translate()
+    texts = list(CATALOGS['uz_cyrl'])[:10] + ['Tarjimasi yo\'q matn']
+
+    with app.test_request_context('/?lang=uz_cyrl'):
+        assert [_(t) for t in texts] == [legacy_translate(t) for t in texts]
+
+        results = {}
+        for name, func in (('legacy dict _()', legacy_translate), ('catalog _()', _)):
+            seconds = min(timeit.repeat(lambda: [func(t) for t in texts], number=number // len(texts), repeat=5))
+            results[name] = seconds / number * 1e9
+            print(f"{name:<16} {results[name]:8.1f} ns/call")
+
+    print(f"Speedup: {results['legacy dict _()'] / results['catalog _()']:.1f}x "
+          f"({len(CATALOGS['uz_cyrl'])} messages per language)")
+
+
+if __name__ == '__main__':
+    bench_translations()
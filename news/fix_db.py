@@ -1,4 +1,4 @@
-from app import app, db, SuperAdmin
+from app import app, db, init_db, SuperAdmin
 
 def check_db():
     with app.app_context():
@@ -22,13 +22,8 @@ def check_db():
             print(f"Error accessing DB: {e}")
             # Try creating tables if they don't exist logic failed earlier
             try:
-                db.create_all()
-                print("Tables created.")
-                new_admin = SuperAdmin(username='superadmin')
-                new_admin.set_password('admin123')
-                db.session.add(new_admin)
-                db.session.commit()
-                print("SuperAdmin created.")
+                init_db()
+                print("Tables created, SuperAdmin and default categories seeded.")
             except Exception as e2:
                 print(f"Critical Error: {e2}")
 
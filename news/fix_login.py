@@ -1,9 +1,9 @@
-from app import app, db, SuperAdmin
+from app import app, db, init_db, SuperAdmin
 from werkzeug.security import generate_password_hash
 
 def fix_superadmin():
     with app.app_context():
-        db.create_all()
+        init_db()
         
         user = SuperAdmin.query.filter_by(username='superadmin').first()
         if user:
@@ -2,15 +2,17 @@ import os
 import uuid
 import time
 from datetime import datetime, timedelta
-from app import app, db, News, Region, Admin
+from app import create_app, db, News, Region, Admin
 
 def verify_app():
     # Use a unique test database file
     unique_id = str(uuid.uuid4())[:8]
     test_db_file = f'test_news_{unique_id}.db'
     
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.abspath(test_db_file)}'
-    app.config['TESTING'] = True
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(test_db_file)}',
+        'TESTING': True,
+    })
     
     print(f"Using DB: {app.config['SQLALCHEMY_DATABASE_URI']}")
     
@@ -80,11 +82,15 @@ def verify_app():
         else:
              print("Region Filter Verification: FAILED")
 
-    # Cleanup
+    # Cleanup: close the pool first, then the database and its WAL sidecar files
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
     try:
-        if os.path.exists(test_db_file):
-            os.remove(test_db_file)
-            print("Cleanup: PASSED")
+        for path in (test_db_file, test_db_file + '-wal', test_db_file + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+        print("Cleanup: PASSED")
     except:
         pass
 
@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+import time
+from app import (create_app, db, init_db, bump_cache_version, cache_versions, cached_taxonomy, news_added,
+                 refresh_trending, News, Admin, Region, FileSystemCache)
+
+
+def cache_files(directory):
+    return sum(len(files) for _root, _dirs, files in os.walk(directory))
+
+
+def verify_cache():
+    directory = tempfile.mkdtemp(prefix='verify_cache_')
+    cache_dir = os.path.join(directory, 'response_cache')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'news.db'),
+        'RESPONSE_CACHE': 'filesystem',
+        'RESPONSE_CACHE_DIR': cache_dir,
+        'RESPONSE_CACHE_MAX_ENTRIES': 8,
+        'WRITE_BEHIND_INTERVAL': 0,  # likes are flushed inline
+        'TESTING': True,
+    })
+    client = app.test_client()
+
+    try:
+        with app.app_context():
+            init_db()
+            region = Region(name='Cache Region', slug='cache-region')
+            db.session.add(region)
+            db.session.flush()
+            admin = Admin(username='cacher', region_id=region.id)
+            admin.set_password('admin')
+            db.session.add(admin)
+            db.session.flush()
+            news = News(title='Cached News', content='Body', admin_id=admin.id, region_id=region.id)
+            db.session.add(news)
+            news_added(news)
+            db.session.commit()
+            region_id, news_id = region.id, news.id
+
+        # Tracking parameters and a foreign Host must not end up in the page others get
+        first = client.get('/?utm_source=mail&fbclid=abc', base_url='http://evil.example')
+        assert first.headers['X-Cache'] == 'MISS'
+        assert b'utm_source' not in first.data and b'fbclid' not in first.data
+        assert b'<link rel="canonical" href="http://evil.example/">' in first.data
+        response = client.get('/')
+        assert response.headers['X-Cache'] == 'MISS', 'page cached for another host was served'
+        assert b'evil.example' not in response.data
+        assert b'<link rel="canonical" href="http://localhost/">' in response.data
+        assert b'data-news-url="http://localhost/' in response.data
+        assert client.get('/?utm_campaign=x').headers['X-Cache'] == 'HIT'
+        assert b'href="http://localhost/?region_id=%d"' % region_id in client.get(
+            '/?region_id=%d&gclid=1' % region_id).data
+        print("Response Cache Host/Tracking Args Verification: PASSED")
+
+        # A like keeps the cached page and its ETag; the count comes from /api/likes
+        page = client.get('/?region_id=%d' % region_id)
+        counts = client.get('/api/likes?ids=%d,x' % news_id)
+        assert counts.status_code == 400
+        assert client.get('/api/likes?ids=%d,999999' % news_id).json == {str(news_id): 0}
+        counts = client.get('/api/likes?ids=%d' % news_id)
+        assert client.post('/news/%d/like' % news_id).json['likes'] == 1
+        again = client.get('/?region_id=%d' % region_id)
+        assert again.headers['X-Cache'] == 'HIT' and again.headers['ETag'] == page.headers['ETag']
+        refreshed = client.get('/api/likes?ids=%d' % news_id, headers={'If-None-Match': counts.headers['ETag']})
+        assert refreshed.status_code == 200 and refreshed.json == {str(news_id): 1}, refreshed.json
+        unchanged = client.get('/api/likes?ids=%d' % news_id, headers={'If-None-Match': refreshed.headers['ETag']})
+        assert unchanged.status_code == 304
+        print("Like Counts Outside Page Cache Verification: PASSED")
+
+        # Only a changed ranking bumps 'trending', and only ?sort=trending depends on it
+        trending_url = '/?region_id=%d&sort=trending' % region_id
+        client.get(trending_url)
+        with app.app_context():
+            refresh_trending()
+            assert 'trending' not in cache_versions()  # no views, nothing ranked
+        assert client.get(trending_url).headers['X-Cache'] == 'HIT'
+        client.get('/news/%d' % news_id, follow_redirects=True)  # a view, written inline
+        with app.app_context():
+            refresh_trending()
+            version = cache_versions()['trending']
+            refresh_trending()  # scores decay, the order stays
+            assert cache_versions()['trending'] == version
+        assert client.get(trending_url).headers['X-Cache'] == 'MISS'
+        assert client.get(trending_url).headers['X-Cache'] == 'HIT'
+        assert client.get('/?region_id=%d' % region_id).headers['X-Cache'] == 'HIT'
+        print("Trending Version Verification: PASSED")
+
+        # Every bump moves the pages to new keys; the old files must not pile up
+        for _ in range(20):
+            with app.app_context():
+                bump_cache_version('news')
+                db.session.commit()
+            assert client.get('/').headers['X-Cache'] == 'MISS'
+            assert client.get('/?page=2').headers['X-Cache'] == 'MISS'
+            assert client.get('/').headers['X-Cache'] == 'HIT'
+        assert cache_files(cache_dir) <= 8, cache_files(cache_dir)
+        print("Response Cache Entry Budget Verification: PASSED")
+
+        cache = FileSystemCache(os.path.join(directory, 'bytes'), max_bytes=1000)
+        cache.set('expired', b'x' * 10, ttl=0.01)
+        time.sleep(0.02)
+        for i in range(30):
+            cache.set('page %d' % i, b'x' * 100)
+        assert cache.get('expired') is None and cache.get('page 29') == b'x' * 100
+        assert cache_files(cache.directory) <= 10, cache_files(cache.directory)
+        cache.set('too big', b'x' * 1001)
+        assert cache.get('too big') is None
+        print("Response Cache Byte Budget Verification: PASSED")
+
+        # Two apps on two databases at the same cache versions keep their own caches
+        apps = []
+        for name in ('first', 'second'):
+            other = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, name + '.db'),
+                                'TESTING': True})
+            with other.app_context():
+                init_db()
+                db.session.add(Region(name='Region ' + name, slug='region-' + name))
+                bump_cache_version('taxonomy')
+                db.session.commit()
+                version = cache_versions()['taxonomy']
+            apps.append((name, other, version))
+        assert apps[0][2] == apps[1][2], 'both databases should be at the same taxonomy version'
+        for name, other, _version in apps:
+            with other.app_context():
+                assert [region.name for region in cached_taxonomy()[0]] == ['Region ' + name]
+                db.engine.dispose()
+            stats = other.test_client().get('/api/stats').json
+            assert [region['name'] for region in stats['regions']] == ['Region ' + name], stats['regions']
+        print("Per-App Cache Verification: PASSED")
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
+        print("Cleanup: PASSED")
+
+
+if __name__ == "__main__":
+    verify_cache()
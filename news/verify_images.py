@@ -0,0 +1,91 @@
+import http.server
+import os
+import shutil
+import tempfile
+import threading
+import app as news_app
+from app import create_app, download_image
+
+# Smallest valid GIF: what the test server hands out as an image
+GIF = (b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+       b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;')
+
+
+class ImageServer(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        redirects = {
+            '/to-local': 'http://127.0.0.1:%d/image.gif' % self.server.server_port,
+            '/to-metadata': 'http://169.254.169.254/latest/meta-data/',
+            '/to-relative': '/image.gif',
+            '/loop': '/loop',
+        }
+        if self.path in redirects:
+            self.send_response(302)
+            self.send_header('Location', redirects[self.path])
+            self.end_headers()
+        elif self.path == '/image.gif':
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/gif')
+            self.end_headers()
+            self.wfile.write(GIF)
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+def refused(url):
+    try:
+        download_image(url)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def verify_images():
+    directory = tempfile.mkdtemp(prefix='verify_images_')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'news.db'),
+        'MEDIA_DIR': os.path.join(directory, 'media'),
+        'IMAGE_WORKERS': 0,
+        'TESTING': True,
+    })
+    server = http.server.HTTPServer(('127.0.0.1', 0), ImageServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+
+    # images.test stands for a public host; it only exists through this check,
+    # so a download that works proves the connection used the checked address
+    original_public_address = news_app.public_address
+
+    def public_address(host, port):
+        return '127.0.0.1' if host == 'images.test' else original_public_address(host, port)
+
+    news_app.public_address = public_address
+    try:
+        with app.app_context():
+            assert download_image('http://images.test:%d/image.gif' % port) == GIF
+            assert download_image('http://images.test:%d/to-relative' % port) == GIF
+            print("Pinned Download Verification: PASSED")
+
+            assert refused('http://127.0.0.1:%d/image.gif' % port) == '127.0.0.1 is not a public address'
+            assert refused('http://images.test:%d/to-local' % port) == '127.0.0.1 is not a public address'
+            assert refused('http://images.test:%d/to-metadata' % port) == '169.254.169.254 is not a public address'
+            assert refused('http://localhost:%d/image.gif' % port) == 'localhost is not a public address'
+            assert refused('file:///etc/passwd').startswith('not an http(s) URL')
+            assert refused('http://images.test:%d/loop' % port).startswith('more than')
+            print("Internal Redirect Refusal Verification: PASSED")
+
+            app.config['IMAGE_MAX_BYTES'] = 10
+            assert refused('http://images.test:%d/image.gif' % port) == 'image is larger than 10 bytes'
+            print("Size Limit Verification: PASSED")
+    finally:
+        news_app.public_address = original_public_address
+        server.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+        print("Cleanup: PASSED")
+
+
+if __name__ == "__main__":
+    verify_images()
@@ -0,0 +1,98 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from app import create_app, db, init_db, import_news, reconcile_stats, News, Region, Admin, Category
+
+
+def verify_import():
+    directory = tempfile.mkdtemp(prefix='verify_import_')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'news.db'),
+        'TESTING': True,
+    })
+
+    try:
+        with app.app_context():
+            init_db()
+            region = Region(name='Import Region', slug='import-region')
+            db.session.add(region)
+            db.session.flush()
+            admin = Admin(username='importer', region_id=region.id)
+            admin.set_password('admin')
+            db.session.add(admin)
+            db.session.commit()
+            reconcile_stats()  # the admin above was added without adjust_stats()
+            category = Category.query.first()
+
+            good = {'title': 'Imported', 'content': '<p>Body</p>', 'admin': 'importer'}
+            records = [
+                dict(good, title='Imported 1'),
+                dict(good, title=5),                               # not a string
+                dict(good, title='Content number', content=7),
+                dict(good, title='Created number', created_at=5),
+                dict(good, title='Created list', created_at=['2024']),
+                dict(good, title='Admin object', admin={'id': admin.id}),
+                dict(good, title='Admin bool', admin=True),
+                dict(good, title='Image number', image_url=1),
+                dict(good, title='Unknown admin', admin='nobody'),
+                dict(good, title='Bad date', created_at='yesterday'),
+                dict(good, title='Imported 2', admin=admin.id, category=category.slug,
+                     created_at='2024-05-01T10:00:00+05:00'),
+                dict(good, title='x' * 201),
+            ]
+            lines = '\n'.join(json.dumps(record) for record in records) + '\n{broken\n[1, 2]\n'
+            report = import_news(io.StringIO(lines), 'jsonl', batch_size=2)
+
+            assert report.read == len(records) + 2, report.read
+            assert report.inserted == 2, report.summary()
+            assert len(report.errors) == len(records) + 2 - 2, report.errors
+            messages = dict(report.errors)
+            assert messages[2] == 'title must be a string, not int', messages[2]
+            assert messages[4] == 'created_at must be a string, not int', messages[4]
+            assert messages[6].startswith('admin must be a name or an id'), messages[6]
+            assert messages[len(records) + 1] == 'not a JSON object'
+            second = News.query.filter_by(title='Imported 2').one()
+            assert second.created_at.hour == 5 and second.category_id == category.id
+            drifted = reconcile_stats()
+            assert drifted == [], 'import left scope_stat out of step: %s' % drifted
+            print("Import Row Errors Verification: PASSED")
+
+            # A JSON array file (.json) is one document, not one record per line
+            array = json.dumps([dict(good, title='Array 1'), dict(good, title=[]), dict(good, title='Array 2')],
+                               indent=2)
+            report = import_news(io.StringIO(array), 'json')
+            assert report.inserted == 2 and [line for line, _message in report.errors] == [2], report.errors
+            print("JSON Array Import Verification: PASSED")
+
+            csv_text = 'title,content,admin,category\nCSV 1,Body,importer,%s\n,Body,importer,\nCSV 2,Body,%d,\n' % (
+                category.slug, admin.id)
+            report = import_news(io.StringIO(csv_text), 'csv')
+            assert report.inserted == 2 and report.errors == [(3, 'title is required')], report.errors
+            print("CSV Import Verification: PASSED")
+
+        # The superadmin page reports bad rows instead of failing the request
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['superadmin_id'] = 1
+        body = '\n'.join(json.dumps(record) for record in (dict(good, title='Upload 1'), dict(good, content=[1]),
+                                                           dict(good, title='Upload 2', created_at=2024)))
+        response = client.post('/superadmin/news/import',
+                               data={'file': (io.BytesIO(body.encode()), 'archive.jsonl')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200, response.status_code
+        assert b'content must be a string' in response.data and b'created_at must be a string' in response.data
+        with app.app_context():
+            assert News.query.filter_by(title='Upload 1').count() == 1
+        print("Import Endpoint Verification: PASSED")
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
+        print("Cleanup: PASSED")
+
+
+if __name__ == "__main__":
+    verify_import()
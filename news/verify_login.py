@@ -1,10 +1,12 @@
 import os
-from app import app, db, SuperAdmin, Admin, Region
+from app import app, db, init_db, SuperAdmin, Admin, Region
 
 def verify_login():
     client = app.test_client()
     
     with app.app_context():
+        init_db()
+
         # Ensure superadmin exists
         sa = SuperAdmin.query.filter_by(username='superadmin').first()
         if not sa:
@@ -0,0 +1,103 @@
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from app import (create_app, db, init_db, feed_query, news_added, news_changed, month_key, KeysetPage,
+                 News, Region, Admin)
+
+NEXT_LINK = b'Keyingi</a>'
+
+
+def verify_pagination():
+    directory = tempfile.mkdtemp(prefix='verify_pagination_')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'news.db'),
+        'TESTING': True,
+    })
+    client = app.test_client()
+
+    try:
+        with app.app_context():
+            init_db()
+            region = Region(name='Pagination Region', slug='pagination-region')
+            db.session.add(region)
+            db.session.flush()
+            admin = Admin(username='paginator', region_id=region.id)
+            admin.set_password('admin')
+            db.session.add(admin)
+            db.session.commit()
+            region_id, admin_id = region.id, admin.id
+
+        def add_news(i):
+            with app.app_context():
+                news = News(title='Page News %d' % i, content='Body', admin_id=admin_id, region_id=region_id,
+                            created_at=datetime.utcnow() - timedelta(minutes=i))
+                db.session.add(news)
+                news_added(news)
+                news_changed(month_key(news.created_at))
+                db.session.commit()
+
+        for i in range(10):
+            add_news(i)
+        url = '/?region_id=%d' % region_id
+        assert NEXT_LINK not in client.get(url).data
+
+        # The 11th article has to show up as a next page at once, not after the count expires
+        add_news(10)
+        response = client.get(url)
+        assert response.headers.get('X-Cache') != 'HIT', response.headers.get('X-Cache')
+        assert NEXT_LINK in response.data, 'stale feed total: no link to page 2'
+        assert b'Page News 10' in client.get(url + '&page=2').data
+        print("Fresh Feed Total Verification: PASSED")
+
+        # Cursor pages over created_at ties: groups of 4 articles share a timestamp
+        with app.app_context():
+            tied = datetime(2024, 3, 1, 12, 0)
+            rows = [News(title='Tied %d' % i, content='Body', admin_id=admin_id, region_id=region_id,
+                         created_at=tied - timedelta(minutes=i // 4)) for i in range(23)]
+            db.session.add_all(rows)
+            for news in rows:
+                news_added(news)
+            news_changed(month_key(tied))
+            db.session.commit()
+            query = feed_query(region_id=region_id)
+            expected = [news.id for news in query.order_by(News.created_at.desc(), News.id.desc())]
+
+            pages, cursor = [], ''
+            while cursor is not None:
+                page = KeysetPage(query, cursor, 5, None)
+                pages.append([news.id for news in page.items])
+                assert page.has_prev == (len(pages) > 1)
+                cursor = page.next_cursor
+            assert [news_id for ids in pages for news_id in ids] == expected, 'next pages skip or repeat items'
+            assert [len(ids) for ids in pages] == [5] * 6 + [4]
+
+            # And back again with the 'p' cursors, page by page
+            back, cursor = [], page.prev_cursor
+            while cursor is not None:
+                page = KeysetPage(query, cursor, 5, None)
+                back.append([news.id for news in page.items])
+                cursor = page.prev_cursor
+            assert back == pages[-2::-1], 'previous pages do not mirror the next pages'
+            print("Cursor Ties Verification: PASSED")
+
+        # The same walk through the feed links
+        seen, url = [], '/?cursor=&region_id=%d' % region_id
+        while url:
+            body = client.get(url).data.decode()
+            seen += dict.fromkeys(re.findall(r'(?:Page News|Tied) \d+', body))  # a card names it twice
+            link = re.search(r'href="([^"]*cursor=[^"]+)"[^>]*>Keyingi', body)
+            url = link.group(1).replace('&amp;', '&') if link else None
+        assert len(seen) == len(set(seen)) == 34, seen
+        print("Cursor Links Verification: PASSED")
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
+        print("Cleanup: PASSED")
+
+
+if __name__ == "__main__":
+    verify_pagination()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import event
+import app as news_app
+from app import create_app, db, init_db, news_added, News, Region, Admin, Category
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def verify_queries():
+    directory = tempfile.mkdtemp(prefix='verify_queries_')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'news.db'),
+        'TESTING': True,
+    })
+    client = app.test_client()
+
+    try:
+        with app.app_context():
+            init_db()
+            region = Region(name="Query Region", slug="query-region")
+            db.session.add(region)
+            db.session.commit()
+
+            admins = []
+            for i in range(3):
+                admin = Admin(username=f"queryadmin_{i}", region_id=region.id)
+                admin.set_password("admin")
+                admins.append(admin)
+            db.session.add_all(admins)
+            db.session.commit()
+
+            categories = Category.query.all()
+            base_time = datetime.utcnow()
+            for i in range(30):
+                news = News(
+                    title=f"Query News {i}",
+                    content=f"Content {i}",
+                    admin_id=admins[i % len(admins)].id,
+                    region_id=region.id,
+                    category_id=categories[i % len(categories)].id if categories else None,
+                    created_at=base_time + timedelta(minutes=i)
+                )
+                db.session.add(news)
+                news_added(news)
+            db.session.commit()
+            region_id = region.id
+
+            # Warm the cached feed count so every page below pays the same
+            client.get(f'/?region_id={region_id}')
+
+            # The number of statements per page must not grow with the page size
+            counts = {}
+            original_per_page = news_app.NEWS_PER_PAGE
+            try:
+                for per_page in (3, 10, 25):
+                    news_app.NEWS_PER_PAGE = per_page
+                    with QueryCounter(db.engine) as counter:
+                        response = client.get(f'/?region_id={region_id}')
+                    assert response.status_code == 200
+                    assert response.data.count(b"Query News") >= per_page
+                    counts[per_page] = counter.count
+            finally:
+                news_app.NEWS_PER_PAGE = original_per_page
+
+            print(f"Queries per feed page (per_page -> queries): {counts}")
+            assert len(set(counts.values())) == 1, "query count depends on page size"
+            assert max(counts.values()) <= 5, "too many queries for one feed page"
+            print("Feed Query Count Verification: PASSED")
+
+            # The plans checked are those of the statements the views run
+            result = app.test_cli_runner().invoke(args=['check-query-plans'])
+            assert result.exit_code == 0, result.output
+            assert 'ok   feed\n' in result.output and 'ok   superadmin table title' in result.output
+            print("Query Plan Verification: PASSED")
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
+        print("Cleanup: PASSED")
+
+
+if __name__ == "__main__":
+    verify_queries()
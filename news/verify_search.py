@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+from app import create_app, db, init_db, feed_query, fts_enabled, fts_match_expression, News, Region, Admin
+
+
+def verify_search():
+    directory = tempfile.mkdtemp(prefix='verify_search_')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'news.db'),
+        'TESTING': True,
+    })
+
+    try:
+        with app.app_context():
+            init_db()
+            assert fts_enabled(), 'init_db() did not create news_fts'
+            region = Region(name='Search Region', slug='search-region')
+            db.session.add(region)
+            db.session.flush()
+            admin = Admin(username='searcher', region_id=region.id)
+            admin.set_password('admin')
+            db.session.add(admin)
+            db.session.flush()
+
+            def add(title, content):
+                news = News(title=title, admin_id=admin.id, region_id=region.id)
+                news.set_content(content)
+                db.session.add(news)
+                return news
+
+            in_title = add("O'rmonlar ko'paytirildi", 'Yangi ko‘chatlar ekildi')
+            in_body = add('Suv tejash', 'Qirg‘oqdagi o‘rmon haqida qisqa xabar')
+            modifier = add('Oʻrmon xoʻjaligi', 'Daraxtlar va suv havzalari')
+            cyrillic = add('Ўрмонлар ва яшил ҳудудлар', 'ДАРАХТ экиш')
+            add('Boshqa yangilik', 'Hech qanday aloqasi yoʼq')
+            db.session.commit()
+
+            def titles(search_query, ranked=True):
+                return [news.title for news in feed_query(search_query, ranked=ranked).all()]
+
+            assert fts_match_expression("o'rmon  daraxt") == '"o rmon"* "daraxt"*'
+            assert fts_match_expression('!!! ...') is None
+            assert titles('!!!') == []
+
+            # Title hits outrank body hits (bm25 weights 10:1)
+            found = titles("o'rmon")
+            assert set(found) == {in_title.title, in_body.title, modifier.title}, found
+            assert found.index(in_title.title) < found.index(in_body.title), found
+            print("Search Ranking Verification: PASSED")
+
+            # Every word is a prefix, and all words must match
+            assert set(titles('daraxt')) == {modifier.title}
+            assert titles('ko‘pay') == [in_title.title]
+            assert titles('daraxt suv') == [modifier.title]
+            assert titles('suv yangi') == []
+            print("Search Prefix Verification: PASSED")
+
+            # ' ‘ ’ ʻ ʼ are interchangeable; Cyrillic folds case
+            for spelling in ("o'rmon", 'o‘rmon', 'o’rmon', 'oʻrmon', 'OʼRMON'):
+                assert modifier.title in titles(spelling), spelling
+            assert titles('ўрмон') == [cyrillic.title]
+            assert titles('дарахт') == [cyrillic.title]
+            assert titles('ЯШИЛ', ranked=False) == [cyrillic.title]
+            print("Search Apostrophe/Cyrillic Verification: PASSED")
+
+            # Renamed articles are re-indexed by the triggers
+            in_body.title = 'Qirg‘oq'
+            db.session.commit()
+            assert 'Qirg‘oq' in titles('qirgʻoq') and titles('tejash') == []
+            print("Search Index Sync Verification: PASSED")
+
+        client = app.test_client()
+        response = client.get('/?q=o%27rmon')
+        assert response.status_code == 200 and b'ko&#39;paytirildi' in response.data
+        print("Search Endpoint Verification: PASSED")
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
+        print("Cleanup: PASSED")
+
+
+if __name__ == "__main__":
+    verify_search()